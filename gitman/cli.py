@@ -72,6 +72,20 @@ def main(args=None, function=None):
         dest="skip_changes",
         help="skip dependencies with uncommitted changes",
     )
+    options.add_argument(
+        "-j",
+        "--jobs",
+        type=common.positive_int,
+        default=1,
+        metavar="NUM",
+        help="number of dependencies to update in parallel",
+    )
+    options.add_argument(
+        "--keep-going",
+        action="store_true",
+        dest="keep_going",
+        help="continue past failed dependencies and report them at the end",
+    )
 
     # Main parser
     parser = argparse.ArgumentParser(
@@ -224,6 +238,12 @@ def main(args=None, function=None):
         action="store_true",
         help="keep top level folder location",
     )
+    sub.add_argument(
+        "-b",
+        "--background",
+        action="store_true",
+        help="move dependencies aside and delete them in the background",
+    )
 
     # Show parser
     info = "display the path of a dependency or internal file"
@@ -244,6 +264,12 @@ def main(args=None, function=None):
     sub.add_argument(
         "-l", "--log", action="store_true", help="display the path of the log file"
     )
+    sub.add_argument(
+        "-p",
+        "--performance",
+        action="store_true",
+        help="display the performance settings of each dependency",
+    )
 
     # Edit parser
     info = "open the config file in the default editor"
@@ -255,6 +281,57 @@ def main(args=None, function=None):
         formatter_class=common.WideHelpFormatter,
     )
 
+    # Cache parser
+    info = "manage the shared cache of repository mirrors"
+    sub = subs.add_parser(
+        "cache",
+        description=info.capitalize() + ".",
+        help=info,
+        formatter_class=common.WideHelpFormatter,
+    )
+    actions = sub.add_subparsers(
+        help="", dest="action", metavar="<action>", required=True
+    )
+
+    info = "delete unused mirrors from the cache"
+    action = actions.add_parser(
+        "gc",
+        description=info.capitalize() + ".",
+        help=info,
+        parents=[debug],
+        formatter_class=common.WideHelpFormatter,
+    )
+    action.add_argument(
+        "-m",
+        "--max-size",
+        type=common.size,
+        dest="max_size",
+        metavar="SIZE",
+        help="delete least recently used mirrors until the cache fits (e.g. 20G)",
+    )
+    action.add_argument(
+        "--dissociate",
+        action="store_true",
+        help="copy objects into checkouts that use mirrors being deleted",
+    )
+
+    info = "repack and index mirrors in the cache"
+    action = actions.add_parser(
+        "maintain",
+        description=info.capitalize() + ".",
+        help=info,
+        parents=[debug],
+        formatter_class=common.WideHelpFormatter,
+    )
+    action.add_argument(
+        "-t",
+        "--time-limit",
+        type=common.positive_int,
+        dest="time_limit",
+        metavar="SECONDS",
+        help="stop starting maintenance on mirrors after this long",
+    )
+
     # Parse arguments
     namespace = parser.parse_args(args=args)
 
@@ -292,6 +369,8 @@ def _get_command(function, namespace):
             skip_changes=namespace.skip_changes,
             skip_scripts=namespace.no_scripts,
             skip_patches=namespace.no_patches,
+            jobs=namespace.jobs,
+            keep_going=namespace.keep_going,
         )
         if namespace.command == "install":
             kwargs.update(
@@ -326,6 +405,7 @@ def _get_command(function, namespace):
             root=namespace.root,
             force=namespace.force,
             keep_location=namespace.keep_location,
+            background=namespace.background,
         )
 
     elif namespace.command == "show":
@@ -338,6 +418,8 @@ def _get_command(function, namespace):
             args.append("__config__")
         if namespace.log:
             args.append("__log__")
+        if namespace.performance:
+            args.append("__performance__")
 
     elif namespace.command == "edit":
         function = commands.edit
@@ -345,6 +427,18 @@ def _get_command(function, namespace):
             root=namespace.root,
         )
 
+    elif namespace.command == "cache":
+        function = getattr(commands, namespace.action)
+        if namespace.action == "gc":
+            kwargs.update(
+                max_size=namespace.max_size,
+                dissociate=namespace.dissociate,
+            )
+        if namespace.action == "maintain":
+            kwargs.update(
+                time_limit=namespace.time_limit,
+            )
+
     return function, args, kwargs
 
 
@@ -367,6 +461,9 @@ def _run_command(function, args, kwargs):
         exit_message = "Run again with '--force' to ignore script errors"
     except exceptions.PatchFailure as exception:
         _show_error(exception)
+    except exceptions.DependencyFailures as exception:
+        _show_error(exception)
+        exit_message = "Fix the errors above and run again"
     except exceptions.InvalidConfig as exception:
         _show_error(exception)
         exit_message = "Adapt config and run again"
@@ -1,12 +1,13 @@
 """Functions to manage the installation of dependencies."""
 
 import datetime
+import os
 
 import log
 from startfile import startfile
 
-from . import common
-from .decorators import preserve_cwd
+from . import common, git, mirrors, settings, shell
+from .decorators import defer_maintenance, manage_cache, preserve_cwd, stop_coprocesses
 from .models import Config, Source, find_nested_configs, load_config
 
 
@@ -50,7 +51,10 @@ def init(*, force: bool = False):
     return success
 
 
+@manage_cache
+@defer_maintenance
 @preserve_cwd
+@stop_coprocesses
 def install(
     *names,
     root=None,
@@ -63,6 +67,8 @@ def install(
     skip_default_group=False,
     skip_scripts=False,
     skip_patches=False,
+    jobs=1,
+    keep_going=False,
 ):
     """Install dependencies for a project.
 
@@ -83,6 +89,8 @@ def install(
      `*names` is empty
     - `skip_scripts`: indicates scripts should be skipped
     - `skip_patches`: indicates patches should be skipped
+    - `jobs`: number of dependencies to update in parallel
+    - `keep_going`: indicates failed dependencies should be reported at the end
     """
     log.info(
         "%sInstalling dependencies: %s",
@@ -92,6 +100,8 @@ def install(
     count = None
 
     config = load_config(root)
+    if config:
+        config.purge_trash()
     configs = [config] if config else []
     configs.extend(find_nested_configs(root, depth, []))
 
@@ -114,6 +124,8 @@ def install(
             clean=clean,
             skip_changes=skip_changes,
             skip_default_group=skip_default_group,
+            jobs=jobs,
+            keep_going=keep_going,
         )
         count += _count  # type: ignore
 
@@ -130,7 +142,10 @@ def install(
     return _display_result("install", "Installed", count)
 
 
+@manage_cache
+@defer_maintenance
 @preserve_cwd
+@stop_coprocesses
 def update(
     *names,
     root=None,
@@ -144,6 +159,8 @@ def update(
     skip_default_group=False,
     skip_scripts=False,
     skip_patches=False,
+    jobs=1,
+    keep_going=False,
 ):
     """Update dependencies for a project.
 
@@ -165,6 +182,8 @@ def update(
      `*names` is empty
     - `skip_scripts`: indicates scripts should be skipped
     - `skip_patches`: indicates patches should be skipped
+    - `jobs`: number of dependencies to update in parallel
+    - `keep_going`: indicates failed dependencies should be reported at the end
     """
     log.info(
         "%s dependencies%s: %s",
@@ -175,6 +194,8 @@ def update(
     count = None
 
     config = load_config(root)
+    if config:
+        config.purge_trash()
     configs = [config] if config else []
     configs.extend(find_nested_configs(root, depth, []))
 
@@ -197,6 +218,8 @@ def update(
             clean=clean,
             skip_changes=skip_changes,
             skip_default_group=skip_default_group,
+            jobs=jobs,
+            keep_going=keep_going,
         )
         count += _count  # type: ignore
 
@@ -223,6 +246,7 @@ def update(
 
 
 @preserve_cwd
+@stop_coprocesses
 def display(*, root=None, depth=None, allow_dirty=True):
     """Display installed dependencies for a project.
 
@@ -271,6 +295,7 @@ def display(*, root=None, depth=None, allow_dirty=True):
 
 
 @preserve_cwd
+@stop_coprocesses
 def lock(*names, depth=None, root=None):
     """Lock current dependency versions for a project.
 
@@ -302,7 +327,8 @@ def lock(*names, depth=None, root=None):
 
 
 @preserve_cwd
-def delete(*, root=None, force=False, keep_location=False):
+@stop_coprocesses
+def delete(*, root=None, force=False, keep_location=False, background=False):
     """Delete dependencies for a project.
 
     Optional arguments:
@@ -310,6 +336,7 @@ def delete(*, root=None, force=False, keep_location=False):
     - `root`: specifies the path to the root working tree
     - `force`: indicates uncommitted changes can be overwritten
     - `keep_location`: delete top level folder or keep the location
+    - `background`: move dependencies aside and delete them in the background
 
     """
     log.info("Deleting dependencies...")
@@ -325,9 +352,12 @@ def delete(*, root=None, force=False, keep_location=False):
         common.show("Deleting all dependencies...", color="message", log=False)
         common.newline()
         if keep_location or config.location == ".":
-            config.clean_dependencies()
+            config.clean_dependencies(background=background)
         else:
-            config.uninstall_dependencies()
+            config.uninstall_dependencies(background=background)
+        config.purge_trash()
+        if not settings.CACHE_DISABLE:
+            git.prune_worktrees()
 
     return _display_result("delete", "Deleted", count, allow_zero=True)
 
@@ -347,11 +377,26 @@ def show(*names, root=None):
         return False
 
     for name in names or [None]:
-        common.show(config.get_path(name), color="path")
+        if name == "__performance__":
+            _show_performance(config)
+        else:
+            common.show(config.get_path(name), color="path")
 
     return True
 
 
+def _show_performance(config):
+    for source in config.sources:
+        path = config.get_path(source.name)
+        if source.type != "git" or not os.path.isdir(path):
+            continue
+        with shell.isolated(path):
+            profile, values = git.get_performance()
+        common.show(f"{source.name}: {profile}", color="path")
+        for key, value in values.items():
+            common.show(f"  {key} = {value}", color="shell_info")
+
+
 def edit(*, root=None):
     """Open the configuration file for a project.
 
@@ -370,6 +415,65 @@ def edit(*, root=None):
     return startfile(config.path)
 
 
+def gc(*, max_size=None, dissociate=False):
+    """Delete unused repository mirrors from the cache.
+
+    Optional arguments:
+
+    - `max_size`: delete least recently used mirrors until the cache fits
+    - `dissociate`: indicates checkouts can be copied off mirrors to delete
+
+    """
+    log.info("Collecting cache garbage...")
+
+    if max_size is None and settings.CACHE_MAX_SIZE:
+        max_size = common.size(settings.CACHE_MAX_SIZE)
+
+    common.newline()
+    common.show("Deleting unused mirrors...", color="message", log=False)
+    common.newline()
+
+    removed = mirrors.collect(settings.CACHE, max_size, dissociate=dissociate)
+    for mirror in removed:
+        common.show(f"Deleted {mirror.url or mirror.path}", color="path")
+    if removed:
+        common.newline()
+
+    freed = sum(mirror.size for mirror in removed)
+    common.show(
+        f"Deleted {len(removed)} mirrors ({freed // 1024**2} MB)", color="message"
+    )
+    common.newline()
+
+    return True
+
+
+def maintain(*, time_limit=None):
+    """Repack and index repository mirrors in the cache.
+
+    Optional arguments:
+
+    - `time_limit`: number of seconds after which no more mirrors are started
+
+    """
+    log.info("Maintaining cache...")
+
+    common.newline()
+    common.show("Maintaining mirrors...", color="message", log=False)
+    common.newline()
+
+    maintained = git.maintain_mirrors(settings.CACHE, time_limit=time_limit)
+    for mirror in maintained:
+        common.show(f"Maintained {mirror.url or mirror.path}", color="path")
+    if maintained:
+        common.newline()
+
+    common.show(f"Maintained {len(maintained)} mirrors", color="message")
+    common.newline()
+
+    return True
+
+
 def _display_result(modify, modified, count, allow_zero=False):
     """Convert a command's dependency count to a return status.
 
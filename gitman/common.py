@@ -4,7 +4,9 @@ import argparse
 import logging
 import os
 import sys
+import threading
 import time
+from contextlib import contextmanager
 
 import log
 
@@ -43,6 +45,31 @@ def positive_int(value):
     return value
 
 
+def size(value):
+    """Convert a size with an optional unit suffix to a number of bytes.
+
+    >>> size("1024")
+    1024
+
+    >>> size("1.5K")
+    1536
+
+    >>> size("20G")
+    21474836480
+
+    """
+    value = str(value).strip().upper().rstrip("B")
+    units = "KMGT"
+    exponent = 0
+    if value and value[-1] in units:
+        exponent = units.index(value[-1]) + 1
+        value = value[:-1]
+    number = float(value)
+    if number < 0:
+        raise ValueError(f"Invalid size: {value}")
+    return int(number * 1024**exponent)
+
+
 class _Config:
     """Share logging options."""
 
@@ -97,6 +124,9 @@ def configure_logging(count=0):
         _Config.verbosity = count
 
 
+_output = threading.local()
+
+
 def indent():
     """Increase the indent of future output lines."""
     _Config.indent_level += 1
@@ -130,10 +160,15 @@ def show(
     if color == "message":
         time.sleep(settings.RECORDING_DELAY)
 
+    buffer = getattr(_output, "buffer", None)
+
     for message in messages:
         if _Config.verbosity == 0:
             text = " " * 2 * _Config.indent_level + style(message, color)
-            print(text, file=file)
+            if buffer is None:
+                print(text, file=file)
+            else:
+                buffer.append((text, file))
         elif _Config.verbosity >= 1:
             message = message.strip()
             if message and log:
@@ -146,6 +181,22 @@ def show(
         time.sleep(settings.RECORDING_DELAY)
 
 
+@contextmanager
+def buffered():
+    """Collect output from the current thread until it can be displayed."""
+    _output.buffer = []
+    try:
+        yield _output.buffer
+    finally:
+        del _output.buffer
+
+
+def flush(buffer):
+    """Display output previously collected by `buffered`."""
+    for text, file in buffer:
+        print(text, file=file)
+
+
 def prompt(message: str) -> str:
     message = " " * 2 * _Config.indent_level + style(message, "prompt")
     return input(message).strip().lower()
@@ -1,6 +1,11 @@
 import os
+import sys
 from functools import wraps
 
+import log
+
+from . import common, git, mirrors, settings, shell
+
 
 def preserve_cwd(function):
     @wraps(function)
@@ -11,3 +16,70 @@ def preserve_cwd(function):
         return result
 
     return wrapped
+
+
+def stop_coprocesses(function):
+    @wraps(function)
+    def wrapped(*args, **kwargs):
+        try:
+            return function(*args, **kwargs)
+        finally:
+            git.stop_coprocesses()
+
+    return wrapped
+
+
+def defer_maintenance(function):
+    @wraps(function)
+    def wrapped(*args, **kwargs):
+        if not settings.MAINTENANCE_TIME_LIMIT:
+            return function(*args, **kwargs)
+
+        with git.bulk() as touched:
+            result = function(*args, **kwargs)
+
+        if touched:
+            log.info("Maintaining %s repositories...", len(touched))
+            git.maintain_checkouts(
+                touched,
+                time_limit=settings.MAINTENANCE_TIME_LIMIT,
+                background=settings.MAINTENANCE_DETACH,
+            )
+
+        return result
+
+    return wrapped
+
+
+def manage_cache(function):
+    @wraps(function)
+    def wrapped(*args, **kwargs):
+        result = function(*args, **kwargs)
+        if settings.CACHE_DISABLE:
+            return result
+
+        if settings.CACHE_MAX_SIZE:
+            log.info("Keeping cache under %s...", settings.CACHE_MAX_SIZE)
+            mirrors.collect(max_size=common.size(settings.CACHE_MAX_SIZE))
+
+        if settings.CACHE_MAINTENANCE:
+            if any(mirror.needs_maintenance for mirror in mirrors.scan()):
+                log.info("Scheduling cache maintenance...")
+                shell.detach(
+                    *_gitman(),
+                    "cache",
+                    "maintain",
+                    "--time-limit",
+                    str(settings.CACHE_MAINTENANCE),
+                    "--quiet",
+                )
+
+        return result
+
+    return wrapped
+
+
+def _gitman():
+    if getattr(sys, "frozen", False):
+        return [sys.executable]  # bundled application
+    return [sys.executable, "-m", "gitman"]
@@ -11,6 +11,7 @@ class ShellError(RuntimeError):
     def __init__(self, *args, **kwargs):
         self.program = kwargs.pop("program", None)
         self.output = kwargs.pop("output", None)
+        self.log = kwargs.pop("log", None)
         super().__init__(*args, **kwargs)  # type: ignore
 
 
@@ -28,3 +29,11 @@ class ScriptFailure(ShellError):
 
 class PatchFailure(ShellError):
     """Raised when applying a patch has a non-zero exit code."""
+
+
+class DependencyFailures(RuntimeError):
+    """Raised when dependencies failed while continuing past errors."""
+
+    def __init__(self, *args, **kwargs):
+        self.errors = kwargs.pop("errors", {})
+        super().__init__(*args, **kwargs)  # type: ignore
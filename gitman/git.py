@@ -1,15 +1,58 @@
 """Utilities to call Git commands."""
 
+import atexit
+import datetime
+import functools
+import hashlib
 import os
 import re
 import shutil
-from contextlib import suppress
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
 
 import log
 
-from . import common, settings
-from .exceptions import ShellError
-from .shell import call, pwd
+from . import common, gitdir, mirrors, settings
+from .exceptions import InvalidRepository, ShellError
+from .shell import Coprocess, call, configured, detach, iterate, pwd
+
+# Number of stash entries kept in a dependency, each from a forced update
+STASH_LIMIT = 10
+
+# Age after which late pushes are unlikely to change what a date resolves to
+SETTLED_AGE = datetime.timedelta(days=7)
+
+# Checkout mode creating linked worktrees of cache mirrors
+WORKTREE = "worktree"
+
+# Configuration of the performance profile for checkouts with many files
+PERFORMANCE_CONFIG = {
+    "feature.manyFiles": "true",
+    "core.untrackedCache": "true",
+    "checkout.workers": "0",
+    "index.threads": "true",
+    "fetch.writeCommitGraph": "true",
+}
+
+# Number of files at which checkouts are tuned automatically
+LARGE_CHECKOUT = 100_000
+
+# Configuration deferring automatic housekeeping during bulk operations
+BULK_CONFIG = {"gc.auto": "0", "maintenance.auto": "false"}
+
+# Clone parameters that conflict with an automatically selected strategy
+NARROWING_PARAMS = ("--depth", "--shallow", "--single-branch", "--branch", "-b")
+
+_touched: Optional[Set[str]] = None
+_coprocesses: Dict[str, Coprocess] = {}
+_coprocesses_lock = threading.Lock()
+
+_refreshed_mirrors: Set[str] = set()
 
 
 def sanitize_sparse_paths(sparse_paths):
@@ -17,6 +60,12 @@ def sanitize_sparse_paths(sparse_paths):
     return [p.rstrip("/*") if p.endswith("/*") else p for p in sparse_paths]
 
 
+def _sparse_spec(sparse_paths) -> str:
+    """Get a digest identifying the sparse-checkout paths to apply."""
+    paths = "\n".join(sanitize_sparse_paths(sparse_paths))
+    return hashlib.sha1(paths.encode("utf-8")).hexdigest()
+
+
 def git(*args, **kwargs):
     return call("git", *args, **kwargs)
 
@@ -25,6 +74,112 @@ def gitsvn(*args, **kwargs):
     return call("git", "svn", *args, **kwargs)
 
 
+@contextmanager
+def bulk():
+    """Defer automatic garbage collection while many repositories are changed.
+
+    Yields the paths of the working trees and mirrors changed within the
+    context, which should be passed to `maintain_checkouts` afterwards.
+    """
+    global _touched
+    if _touched is not None:
+        yield _touched
+        return
+
+    _touched = set()
+    try:
+        with configured(BULK_CONFIG):
+            yield _touched
+    finally:
+        _touched = None
+
+
+def maintain_checkouts(paths, *, time_limit=None, background=False) -> int:
+    """Run automatic housekeeping in repositories changed by a bulk operation.
+
+    No further repositories are started once `time_limit` seconds have
+    passed. Returns the number of repositories that were maintained.
+    """
+    if version() >= (2, 29):
+        args = ["maintenance", "run", "--auto"]
+    else:
+        args = ["gc", "--auto"]
+
+    started = time.time()
+    count = 0
+    for path in sorted(paths):
+        if time_limit is not None and time.time() - started >= time_limit:
+            log.info("Skipped maintenance of %s repositories", len(paths) - count)
+            break
+        if background:
+            detach("git", "-C", path, *args)
+        else:
+            git("-C", path, *args, _show=False, _ignore=True)
+        count += 1
+    return count
+
+
+def _fetch_options() -> List[str]:
+    """Get the options for fetches, which skip bookkeeping in bulk operations."""
+    if _touched is None or version() < (2, 29):
+        return []
+    return ["--no-write-fetch-head"]
+
+
+@functools.lru_cache()
+def version() -> Tuple[int, ...]:
+    """Get the version of the installed Git program."""
+    try:
+        output = call("git", "--version", _show=False)[0]
+        return tuple(int(part) for part in output.split()[2].split(".")[:3])
+    except (ShellError, IndexError, ValueError):
+        return (0,)
+
+
+def resolve(rev: str) -> Optional[str]:
+    """Get the SHA of a revision in the current repository, if it exists.
+
+    Lookups are answered by a long-lived `git cat-file` process for each
+    repository instead of starting a new process for every query.
+    """
+    path = pwd(_show=False)
+    with _coprocesses_lock:
+        coprocess = _coprocesses.get(path)
+        if coprocess is None:
+            if version() >= (2, 36):
+                coprocess = Coprocess("git", "cat-file", "--batch-command")
+            else:
+                coprocess = Coprocess("git", "cat-file", "--batch-check")
+            _coprocesses[path] = coprocess
+
+    if "--batch-command" in coprocess.args:
+        output = coprocess.query("info " + rev)
+    else:
+        output = coprocess.query(rev)
+
+    parts = output.split(" ")
+    if len(parts) == 3 and is_sha(parts[0]) and parts[2].isdigit():
+        return parts[0]
+    return None
+
+
+def stop_coprocesses(path: Optional[str] = None):
+    """Close long-lived Git processes for one or all repositories."""
+    with _coprocesses_lock:
+        if path is None:
+            coprocesses = list(_coprocesses.values())
+            _coprocesses.clear()
+        elif path in _coprocesses:
+            coprocesses = [_coprocesses.pop(path)]
+        else:
+            coprocesses = []
+    for coprocess in coprocesses:
+        coprocess.close()
+
+
+atexit.register(stop_coprocesses)
+
+
 def clone(
     type,
     repo,
@@ -33,60 +188,349 @@ def clone(
     cache=settings.CACHE,
     sparse_paths=None,
     rev=None,
-    user_params=None
+    user_params=None,
+    filter=None,
+    checkout=None,
 ):
-    """Clone a new Git repository."""
+    """Clone a new Git repository.
+
+    A `filter` (e.g. `blob:none`) makes a partial clone whose missing
+    objects are fetched on demand, backed by a partial mirror in the cache.
+    With `checkout="worktree"`, a linked worktree of the mirror is created.
+    """
     log.debug("Creating a new repository...")
 
     if user_params is None:
         user_params = []
+    if filter:
+        user_params = [f"--filter={filter}", *user_params]
 
     if type == "git-svn":
         # just the preparation for the svn deep clone / checkout here
         # clone will be made in update function to simplify source.py).
-        os.makedirs(path)
+        os.makedirs(os.path.join(pwd(_show=False), path))
         return
 
     assert type == "git"
 
-    name = repo.split("/")[-1]
-    if name.endswith(".git"):
-        name = name[:-4]
-
     normpath = os.path.normpath(path)
-    reference = os.path.join(cache, name + ".reference")
-    sparse_paths_repo = repo if settings.CACHE_DISABLE else reference
-
-    if not settings.CACHE_DISABLE and not os.path.isdir(reference):
-        git("clone", "--mirror", repo, reference, *user_params)
-
-    if sparse_paths and sparse_paths[0]:
-        os.makedirs(normpath)
-        git("-C", normpath, "init")
-        git("-C", normpath, "remote", "add", "origin", repo)
-
-        if not settings.CACHE_DISABLE:
-            with open(
-                "%s/%s/.git/objects/info/alternates" % (os.getcwd(), normpath),
-                "w",
-                encoding="utf-8",
-            ) as fd:
-                fd.write("%s/objects" % sparse_paths_repo)
-
-        git("-C", normpath, "sparse-checkout", "init", "--cone")
+    mirror = None
+    reference = repo
+    if not settings.CACHE_DISABLE:
+        mirror = mirrors.get(repo, cache, filter)
+        reference = mirror.path
+    sparse_paths_repo = reference
+    worktree = checkout == WORKTREE and mirror is not None
+
+    # Keep the mirror from being collected until the checkout is registered
+    with mirrors.locked(mirror) if mirror is not None else nullcontext():
+        if mirror is not None:
+            _prepare_mirror(mirror, repo, rev, user_params, fetch=worktree)
+
+        strategy = None
+        if settings.CLONE_STRATEGY == "auto" and not worktree:
+            if not (sparse_paths and sparse_paths[0]) and not any(
+                param.startswith(NARROWING_PARAMS) for param in user_params
+            ):
+                exists = mirror is not None and mirror.exists
+                strategy = _select_strategy(reference if exists else repo, rev)
+                user_params = [*_strategy_params(strategy, rev, filter), *user_params]
+
+        if sparse_paths and sparse_paths[0]:
+            os.makedirs(os.path.join(pwd(_show=False), normpath))
+            git("-C", normpath, "init")
+            git("-C", normpath, "remote", "add", "origin", repo)
+
+            if not settings.CACHE_DISABLE:
+                with open(
+                    "%s/%s/.git/objects/info/alternates" % (pwd(_show=False), normpath),
+                    "w",
+                    encoding="utf-8",
+                ) as fd:
+                    fd.write("%s/objects" % sparse_paths_repo)
+
+            # Only download the contents of files inside the sparse cone
+            git("-C", normpath, "config", "remote.origin.promisor", "true")
+            git(
+                "-C",
+                normpath,
+                "config",
+                "remote.origin.partialclonefilter",
+                filter or "blob:none",
+            )
+            git("-C", normpath, "config", "index.sparse", "true")
+            git("-C", normpath, "sparse-checkout", "init", "--cone")
+            git(
+                "-C",
+                normpath,
+                "sparse-checkout",
+                "set",
+                *sanitize_sparse_paths(sparse_paths),
+            )
+            git(
+                "-C",
+                normpath,
+                "config",
+                "gitman.sparseSpec",
+                _sparse_spec(sparse_paths),
+            )
+            if settings.CACHE_DISABLE:
+                git("-C", normpath, "fetch", *_fetch_options(), "origin")
+            else:
+                git("-C", normpath, *_mirror_fetch_args(reference))
+            git("-C", normpath, "checkout", rev)
+        elif worktree:
+            # Objects, refs, and fetches are shared by every worktree of the mirror
+            args = [
+                "worktree",
+                "add",
+                "--detach",
+                os.path.join(pwd(_show=False), normpath),
+            ]
+            if rev and "@{" not in rev:
+                args.append(rev)
+            # Forget worktrees whose directories were deleted without uninstalling
+            git("-C", reference, "worktree", "prune", _show=False)
+            git("-C", reference, *args)
+        elif settings.CACHE_DISABLE:
+            git("clone", repo, normpath, *user_params)
+        elif settings.CACHE_MIRROR_FETCH and not filter:
+            git("clone", "--shared", reference, normpath, *user_params)
+            git("-C", normpath, "remote", "set-url", "origin", repo)
+        else:
+            git("clone", "--reference-if-able", reference, repo, normpath, *user_params)
+
+        if strategy:
+            git("-C", normpath, "config", "gitman.strategy", strategy)
+        if mirror is not None:
+            mirror.register(os.path.join(pwd(_show=False), normpath))
+
+
+def _select_strategy(remote, rev) -> str:
+    """Choose how much of a repository to clone for a revision."""
+    if not rev or "@{" in rev:
+        return "full"  # dates need the history of a branch
+    if is_sha(rev):
+        return "commit" if len(rev) == 40 else "full"
+    return _ref_kind(rev, remote) or "full"
+
+
+def _strategy_params(strategy, rev, filter=None) -> List[str]:
+    """Get the clone parameters implementing a strategy.
+
+    Shallow and filtered clones are only used without the cache, since
+    objects borrowed from a mirror are never transferred anyway.
+    """
+    if strategy == "branch":
+        return ["--single-branch", "--branch", rev]
+    if strategy == "tag":
+        params = ["--single-branch", "--branch", rev]
+        if settings.CACHE_DISABLE:
+            params.append("--depth=1")
+        return params
+    if strategy == "commit":
+        params = ["--single-branch", "--no-tags"]
+        if settings.CACHE_DISABLE and not filter:
+            params.append("--filter=blob:none")
+        return params
+    return []
+
+
+def _prepare_mirror(
+    mirror: mirrors.Mirror, repo, rev=None, user_params=(), *, fetch=False
+):
+    if mirror.exists:
+        refresh_mirror(mirror, rev, force=fetch or settings.CACHE_MIRROR_FETCH)
+        mirror.used_now()
+        return
+
+    with mirrors.locked(mirror):
+        if mirror.exists:
+            log.info("Mirror was created by another process: %s", mirror.path)
+            mirror.load()
+            mirror.used_now()
+            return
+
+        # Build the mirror elsewhere so readers never see a partial copy
+        temporary = tempfile.mkdtemp(
+            prefix=os.path.basename(mirror.path) + ".", dir=os.path.dirname(mirror.path)
+        )
+        try:
+            git("clone", "--mirror", repo, temporary, *user_params)
+            os.rename(temporary, mirror.path)
+        finally:
+            if os.path.isdir(temporary):
+                shutil.rmtree(temporary, ignore_errors=True)
+        mirror.created_now()
+        _refreshed_mirrors.add(mirror.path)
+
+
+def _worktree_mirror() -> Optional[str]:
+    """Get the cache mirror the current working tree is a linked worktree of."""
+    repository = gitdir.find(pwd(_show=False))
+    if repository is None or repository.gitdir == repository.commondir:
+        return None
+    if not repository.commondir.endswith(mirrors.EXTENSION):
+        return None
+    return repository.commondir
+
+
+def prune_worktrees(cache=settings.CACHE):
+    """Forget linked worktrees of cache mirrors that have been deleted."""
+    for mirror in mirrors.scan(cache):
+        if os.path.isdir(os.path.join(mirror.path, "worktrees")):
+            git("-C", mirror.path, "worktree", "prune", _show=False)
+
+
+def _register_checkout(repo, cache=settings.CACHE, filter=None):
+    """Record the current checkout with the mirror it borrows objects from.
+
+    Every update counts as a use of the mirror, which keeps mirrors that are
+    still needed from being collected as the least recently used.
+    """
+    checkout = pwd(_show=False)
+    mirror = mirrors.get(repo, cache, filter)
+    if not mirror.exists:
+        return
+    mirror.used_now()
+    if mirrors.borrows(checkout, mirror.path):
+        mirror.register(checkout)
+
+
+def _mirror_fetch_args(path: str) -> List[str]:
+    return [
+        "fetch",
+        *_fetch_options(),
+        "--tags",
+        "--force",
+        "--prune",
+        path,
+        "+refs/heads/*:refs/remotes/origin/*",
+    ]
+
+
+def refresh_mirror(
+    mirror: mirrors.Mirror, rev: Optional[str] = None, *, force: bool = False
+) -> bool:
+    """Fetch new objects into a cache mirror when it is stale or lacks a revision.
+
+    Each mirror is fetched at most once per run, no matter how many
+    dependencies share it. With `force`, the age of the mirror is ignored.
+    """
+    started = time.time()
+    with mirrors.locked(mirror):
+        if mirror.path in _refreshed_mirrors:
+            return False
+        mirror.load()
+        if mirror.refreshed >= started:
+            log.debug("Mirror was refreshed by another process: %s", mirror.path)
+            _refreshed_mirrors.add(mirror.path)
+            return False
+        if not force and not mirror.stale(settings.CACHE_TTL):
+            if _mirror_contains(mirror, rev):
+                log.debug("Mirror is up to date: %s", mirror.path)
+                return False
+
+        log.info("Refreshing mirror: %s", mirror.path)
+        try:
+            git("-C", mirror.path, "fetch", *_fetch_options(), "--prune", "origin")
+        except ShellError as exception:
+            log.warning("Unable to refresh mirror %s: %s", mirror.path, exception)
+            return False
+        finally:
+            _refreshed_mirrors.add(mirror.path)
+
+        if _touched is not None:
+            _touched.add(mirror.path)
+        mirror.refreshed_now()
+        return True
+
+
+def maintain_mirrors(
+    cache=settings.CACHE, *, time_limit: Optional[float] = None, force=False
+) -> List[mirrors.Mirror]:
+    """Incrementally repack and index cache mirrors, oldest maintenance first.
+
+    No further mirrors are started once `time_limit` seconds have passed.
+    Mirrors without new objects since their last maintenance and mirrors
+    being modified by another process are skipped.
+    """
+    deadline = None if time_limit is None else time.time() + time_limit
+    candidates = sorted(mirrors.scan(cache), key=lambda mirror: mirror.maintained)
+
+    maintained = []
+    for mirror in candidates:
+        if deadline is not None and time.time() >= deadline:
+            log.info("Maintenance time limit reached")
+            break
+        if not (force or mirror.needs_maintenance):
+            continue
+        with mirrors.locked(mirror, wait=False) as acquired:
+            if not acquired:
+                log.info("Skipped mirror in use: %s", mirror.path)
+                continue
+            try:
+                _maintain_mirror(mirror.path)
+            except ShellError as exception:
+                log.warning("Unable to maintain mirror %s: %s", mirror.path, exception)
+                continue
+            mirror.maintained_now()
+        maintained.append(mirror)
+
+    return maintained
+
+
+def _maintain_mirror(path: str):
+    log.info("Maintaining mirror: %s", path)
+    hide = {"_show": False}
+    git("-C", path, "pack-refs", "--all", **hide)
+    if _is_promisor(path):
+        # Geometric repacks and bitmaps are unsupported with promisor packs
+        args = ["--write-midx"] if version() >= (2, 34) else []
+        git("-C", path, "repack", "-a", "-d", *args, **hide)
+    elif version() >= (2, 34):
+        # Combine packs geometrically instead of rewriting the whole mirror
         git(
             "-C",
-            normpath,
-            "sparse-checkout",
-            "set",
-            *sanitize_sparse_paths(sparse_paths)
+            path,
+            "repack",
+            "-d",
+            "--geometric=2",
+            "--write-midx",
+            "--write-bitmap-index",
+            **hide,
         )
-        git("-C", normpath, "fetch", "origin")
-        git("-C", normpath, "checkout", rev)
-    elif settings.CACHE_DISABLE:
-        git("clone", repo, normpath, *user_params)
     else:
-        git("clone", "--reference-if-able", reference, repo, normpath, *user_params)
+        git("-C", path, "repack", "-a", "-d", "--write-bitmap-index", **hide)
+    git("-C", path, "commit-graph", "write", "--reachable", "--split", **hide)
+
+
+def _is_promisor(path: str) -> bool:
+    """Determine if a mirror is a partial clone missing some objects."""
+    config = gitdir.read_config(os.path.join(path, "config"))
+    if config is not None:
+        values = config.get('remote "origin".promisor')
+        return values[-1].lower() == "true" if values else False
+    lines = git(
+        "-C",
+        path,
+        "config",
+        "--bool",
+        "remote.origin.promisor",
+        _show=False,
+        _ignore=True,
+    )
+    return bool(lines) and lines[0] == "true"
+
+
+def _mirror_contains(mirror: mirrors.Mirror, rev: Optional[str]) -> bool:
+    if not rev or "@" in rev:
+        return True  # dates are resolved against the fetched branch
+    try:
+        git("-C", mirror.path, "cat-file", "-e", rev + "^{commit}", _show=False)
+    except ShellError:
+        return False
+    return True
 
 
 def create_branch_local(type, name: str, base_ref: str = "HEAD", recreate: bool = True):
@@ -131,8 +575,15 @@ def is_sha(rev):
     return re.match("^[0-9a-f]{7,40}$", rev) is not None
 
 
-def fetch(type, repo, path, rev=None):  # pylint: disable=unused-argument
-    """Fetch the latest changes from the remote repository."""
+def fetch(
+    type, repo, path, rev=None, *, cache=settings.CACHE, filter=None, refresh=False
+):
+    """Fetch the latest changes from the remote repository.
+
+    Worktrees share the cache mirror, which is only fetched regardless of
+    its age with `refresh`.
+    """
+    # pylint: disable=unused-argument
 
     if type == "git-svn":
         # deep clone happens in update function
@@ -140,8 +591,47 @@ def fetch(type, repo, path, rev=None):  # pylint: disable=unused-argument
 
     assert type == "git"
 
+    worktree = _worktree_mirror()
+    if worktree:
+        # Worktrees share refs with the mirror, so fetching it is enough
+        refresh_mirror(mirrors.Mirror(worktree), rev, force=refresh)
+        stop_coprocesses(pwd(_show=False))
+        return
+
+    if _touched is not None:
+        _touched.add(pwd(_show=False))
+    if not settings.CACHE_DISABLE:
+        mirror = mirrors.get(repo, cache, filter)
+        # Partial mirrors cannot serve the objects they are missing
+        if settings.CACHE_MIRROR_FETCH and not filter:
+            _prepare_mirror(mirror, repo, rev)
+            if _mirror_contains(mirror, rev):
+                git("remote", "set-url", "origin", repo)
+                if _get_config("gitman.strategy") not in (None, "full"):
+                    # Every branch is copied from the mirror, so track them all
+                    _widen()
+                git(*_mirror_fetch_args(mirror.path))
+                stop_coprocesses(pwd(_show=False))
+                return
+            log.info("Revision %s is missing from mirror, fetching from remote", rev)
+        elif mirror.exists:
+            refresh_mirror(mirror, rev)
+
     git("remote", "set-url", "origin", repo)
-    args = ["fetch", "--tags", "--force", "--prune", "origin"]
+    narrow = _get_config("gitman.strategy") not in (None, "full")
+    shallow = narrow and _is_shallow()
+    if (settings.FETCH_TARGETED or narrow) and _fetch_targeted(
+        rev, shallow=shallow, narrow=narrow
+    ):
+        stop_coprocesses(pwd(_show=False))
+        return
+
+    if narrow:
+        log.info("Revision requires a full clone, fetching all branches")
+        _widen()
+    args = ["fetch", *_fetch_options(), "--tags", "--force", "--prune", "origin"]
+    if shallow:
+        args.append("--unshallow")
     if rev:
         if is_sha(rev):
             pass  # fetch only works with a SHA if already present locally
@@ -150,6 +640,96 @@ def fetch(type, repo, path, rev=None):  # pylint: disable=unused-argument
         else:
             args.append(rev)
     git(*args)
+    stop_coprocesses(pwd(_show=False))
+
+
+def _fetch_targeted(rev, *, shallow=False, narrow=False) -> bool:
+    """Fetch only the refs needed for a revision.
+
+    Returns `False` when the revision cannot be fetched on its own and a
+    full fetch is required instead. Shallow clones are kept shallow, and
+    narrow clones start tracking the branches they fetch.
+    """
+    if not rev:
+        return False
+    if shallow and "@{" in rev:
+        return False  # dates need the history of a branch
+
+    if is_sha(rev):
+        if resolve(rev + "^{commit}"):
+            log.debug("Commit is already present: %s", rev)
+            return True
+        if len(rev) < 40:
+            return False  # servers only accept full object names
+        refspec = rev
+    else:
+        name = rev.split("@{")[0]
+        kind = _ref_kind(name)
+        if kind == "branch":
+            refspec = f"+refs/heads/{name}:refs/remotes/origin/{name}"
+        elif kind == "tag":
+            refspec = f"+refs/tags/{name}:refs/tags/{name}"
+        else:
+            return False
+
+    args = ["fetch", *_fetch_options(), "--no-tags", "--force", "origin", refspec]
+    if shallow:
+        args.insert(-2, "--depth=1")
+    try:
+        git(*args)
+    except ShellError as exception:
+        log.info("Unable to fetch %s on its own: %s", rev, exception)
+        return False
+    if narrow and refspec.startswith("+refs/heads/"):
+        _track(refspec)
+    return True
+
+
+def _track(refspec):
+    """Add a branch to a narrow clone so it can be checked out by name."""
+    if refspec not in _get_config_values("remote.origin.fetch"):
+        git("config", "--add", "remote.origin.fetch", refspec)
+
+
+def _is_shallow() -> bool:
+    """Determine if the current repository is missing history."""
+    repository = gitdir.find(pwd(_show=False))
+    if repository:
+        return os.path.isfile(os.path.join(repository.commondir, "shallow"))
+    return git("rev-parse", "--is-shallow-repository", _show=False)[0] == "true"
+
+
+def _widen():
+    """Undo a narrow clone strategy so every branch and tag can be fetched."""
+    git("config", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*")
+    git("config", "--unset", "remote.origin.tagOpt", _show=False, _ignore=True)
+    git("config", "gitman.strategy", "full")
+
+
+def _ref_kind(name, remote="origin") -> Optional[str]:
+    """Determine if a name refers to a branch or a tag on the remote."""
+    if remote == "origin":
+        if resolve(f"refs/remotes/origin/{name}"):
+            return "branch"
+        if resolve(f"refs/tags/{name}"):
+            return "tag"
+
+    try:
+        lines = git(
+            "ls-remote",
+            remote,
+            f"refs/heads/{name}",
+            f"refs/tags/{name}",
+            _show=False,
+        )
+    except ShellError:
+        return None
+    refs = {line.split("\t")[-1] for line in lines if line}
+    if f"refs/heads/{name}" in refs:
+        return "branch"
+    if f"refs/tags/{name}" in refs:
+        return "tag"
+    return None
 
 
 def valid():
@@ -161,6 +741,9 @@ def valid():
 
     log.debug("Checking for a valid working tree...")
 
+    if gitdir.find(pwd(_show=False)):
+        return True
+
     try:
         git("rev-parse", "--is-inside-work-tree", _show=False)
     except ShellError:
@@ -196,44 +779,117 @@ def rebuild(type, repo):  # pylint: disable=unused-argument
     assert type == "git"
 
     common.show("Rebuilding missing git repo...", color="message")
+    stop_coprocesses(pwd(_show=False))
     git("init", _show=True)
     git("remote", "add", "origin", repo, _show=True)
     common.show("Rebuilt git repo...", color="message")
 
 
-def changes(type, include_untracked=False, display_status=True, _show=False):
-    """Determine if there are changes in the working tree."""
-    status = False
-
+@dataclass
+class Status:
+    """Snapshot of a working tree parsed from a single `git status` call."""
+
+    head: Optional[str] = None
+    branch: Optional[str] = None
+    upstream: Optional[str] = None
+    changes: List[str] = field(default_factory=list)
+    untracked: List[str] = field(default_factory=list)
+    ignored: List[str] = field(default_factory=list)
+    complete: bool = True
+
+    def dirty(self, include_untracked: bool = False) -> bool:
+        """Determine if the working tree differs from HEAD."""
+        if self.head is None:
+            return True
+        return bool(self.changes) or (include_untracked and bool(self.untracked))
+
+    @property
+    def lines(self) -> List[str]:
+        """Summarize the working tree like `git status --short`."""
+        lines = self.changes + self.untracked
+        if not self.complete:
+            lines.append("...")
+        return lines
+
+
+def status(
+    type, include_untracked=False, include_ignored=False, _show=False
+) -> Optional[Status]:
+    """Take a snapshot of the working tree's revision and changes."""
     if type == "git-svn":
-        return status  # ignore changes in case of git-svn
+        return None  # ignore status in case of git-svn
 
     assert type == "git"
 
-    try:
-        # Refresh changes
-        git("update-index", "-q", "--refresh", _show=False)
+    snapshot = Status()
+    args = ["status", "--porcelain=v2", "-z", "--branch"]
+    if include_ignored:
+        # Ignored directories are listed without descending into them
+        args.append("--ignored=traditional")
+    elif not include_untracked:
+        args.append("--untracked-files=no")
 
-        # Check for uncommitted changes
-        git("diff-index", "--quiet", "HEAD", _show=_show)
+    records = iterate("git", *args, _show=_show)
+    try:
+        for record in records:
+            if record.startswith("# branch.oid "):
+                oid = record.split(" ")[-1]
+                snapshot.head = None if oid == "(initial)" else oid
+            elif record.startswith("# branch.head "):
+                head = record.split(" ", 2)[-1]
+                snapshot.branch = None if head == "(detached)" else head
+            elif record.startswith("# branch.upstream "):
+                snapshot.upstream = record.split(" ", 2)[-1]
+            elif record.startswith(("1 ", "u ")):
+                fields = record.split(" ", 10 if record[0] == "u" else 8)
+                snapshot.changes.append(_short_status(fields[1], fields[-1]))
+            elif record.startswith("2 "):
+                fields = record.split(" ", 9)
+                original = next(records, "")
+                snapshot.changes.append(
+                    _short_status(fields[1], f"{original} -> {fields[-1]}")
+                )
+            elif record.startswith("? "):
+                # Untracked entries follow all tracked entries, so one is
+                # enough to know the working tree is dirty
+                snapshot.untracked.append("?? " + record[2:])
+                snapshot.complete = False
+                break
+            elif record.startswith("! "):
+                snapshot.ignored.append("!! " + record[2:])
+                snapshot.complete = False
+                break
+    finally:
+        records.close()
+
+    return snapshot
+
+
+def _short_status(xy, path):
+    return xy.replace(".", " ") + " " + path
+
+
+def changes(
+    type, include_untracked=False, display_status=True, _show=False, snapshot=None
+):
+    """Determine if there are changes in the working tree."""
+    if type == "git-svn":
+        return False  # ignore changes in case of git-svn
 
-        # Check for untracked files
-        lines = git(
-            "ls-files", "--others", "--exclude-standard", _show=_show, _stream=False
-        )
+    assert type == "git"
 
-    except ShellError:
-        status = True
+    if snapshot is None:
+        try:
+            snapshot = status(type, include_untracked=include_untracked, _show=_show)
+        except ShellError:
+            return True
 
-    else:
-        status = bool(lines) and include_untracked
+    dirty = snapshot.dirty(include_untracked)
 
-    if status and display_status:
-        with suppress(ShellError):
-            lines = git("status", _show=True, _stream=False)
-            common.show(*lines, color="git_changes")
+    if dirty and display_status:
+        common.show(*snapshot.lines, color="git_changes")
 
-    return status
+    return dirty
 
 
 def am(patch, _skip=False):
@@ -256,46 +912,363 @@ def am(patch, _skip=False):
         raise ShellError from e
 
 
-def apply_sparse_checkout(sparse_paths):
-    """Re-apply sparse-checkout paths to an existing working tree."""
+def tune(mode="auto") -> Optional[str]:
+    """Apply Git settings that speed up working trees with many files.
+
+    With `auto`, a checkout is measured once and tuned when it is large.
+    The `large` mode always applies the profile and `default` removes it.
+    Returns the name of the profile in effect.
+    """
+    recorded = _get_config("gitman.performance")
+    if mode == "auto":
+        if recorded:
+            return recorded
+        size = _index_size()
+        log.debug("Measured %s files in the working tree", size)
+        profile = "large" if size >= LARGE_CHECKOUT else "default"
+    else:
+        profile = "large" if mode == "large" else "default"
+
+    if profile == recorded:
+        return profile
+
+    if profile == "large":
+        for key, value in _performance_config().items():
+            git("config", key, value)
+        git("commit-graph", "write", "--reachable", _show=False, _ignore=True)
+    elif recorded == "large":
+        for key in _performance_config():
+            git("config", "--unset", key, _show=False, _ignore=True)
+    git("config", "gitman.performance", profile, _show=False)
+    return profile
+
+
+def get_performance() -> Tuple[str, Dict[str, str]]:
+    """Get the performance profile and settings of the current working tree."""
+    profile = _get_config("gitman.performance") or "default"
+    values = {}
+    for key in _performance_config():
+        value = _get_config(key)
+        if value is not None:
+            values[key] = value
+    return profile, values
+
+
+def _performance_config() -> Dict[str, str]:
+    config = dict(PERFORMANCE_CONFIG)
+    # The built-in file system monitor is not available on Linux
+    if sys.platform in {"darwin", "win32"} and version() >= (2, 37):
+        config["core.fsmonitor"] = "true"
+    return config
+
+
+def _index_size() -> int:
+    repository = gitdir.find(pwd(_show=False))
+    size = repository.index_size() if repository is not None else None
+    if size is not None:
+        return size
+    return len(git("ls-files", _show=False))
+
+
+def apply_sparse_checkout(sparse_paths) -> bool:
+    """Re-apply sparse-checkout paths to an existing working tree.
+
+    Returns whether the working tree was changed.
+    """
+    spec = _sparse_spec(sparse_paths)
+    if _get_config("gitman.sparseSpec") == spec:
+        log.debug("Sparse-checkout paths are unchanged")
+        return False
+
+    git("config", "index.sparse", "true")
     git("sparse-checkout", "set", *sanitize_sparse_paths(sparse_paths))
+    git("config", "gitman.sparseSpec", spec)
+    return True
+
+
+def _get_config(name) -> Optional[str]:
+    """Get a value from the current working tree's Git config."""
+    values = _get_config_values(name)
+    return values[-1] if values else None
+
+
+def _get_config_values(name) -> List[str]:
+    """Get every value of a key in the current working tree's Git config."""
+    repository = gitdir.find(pwd(_show=False))
+    config = repository.config if repository is not None else None
+    if config is not None:
+        section, _, key = name.rpartition(".")
+        section, _, subsection = section.partition(".")
+        section = section.lower()
+        if subsection:
+            section += f' "{subsection}"'
+        return config.get(f"{section}.{key.lower()}", [])
+
+    return git("config", "--get-all", name, _show=False, _ignore=True)
 
 
 def update(
-    type, repo, path, *, clean=True, fetch=False, rev=None
+    type, repo, path, *, clean=True, fetch=False, rev=None, filter=None, snapshot=None
 ):  # pylint: disable=redefined-outer-name,unused-argument
+    """Update the working tree to a revision.
+
+    A `snapshot` of the working tree taken by the caller, including ignored
+    files when cleaning, saves checking its status again.
+    """
 
     if type == "git-svn":
-        # make deep clone here for simplification of sources.py
+        # import the svn revision here for simplification of sources.py
         # and to realize consistent readonly clone (always forced)
+        _update_svn(repo, rev, clean=clean)
+        return
 
-        # completly empty current directory (remove also hidden content)
-        for root, dirs, files in os.walk("."):
-            for f in files:
-                os.unlink(os.path.join(root, f))
-            for d in dirs:
-                shutil.rmtree(os.path.join(root, d))
+    assert type == "git"
 
-        # clone specified svn revision
-        gitsvn("clone", "-r", rev, repo, ".")
+    if not settings.CACHE_DISABLE:
+        _register_checkout(repo, filter=filter)
+
+    rev = _get_sha_from_rev(rev, repo, filter)
+    worktree = _worktree_mirror()
+
+    if snapshot is None:
+        try:
+            snapshot = status(type, include_untracked=clean, include_ignored=clean)
+        except ShellError as exception:
+            log.debug("Unable to check working tree: %s", exception)
+    if snapshot and _is_current(
+        snapshot, rev, clean=clean, fetch=fetch, detached=bool(worktree)
+    ):
+        log.info("Working tree is already at %s", rev)
         return
 
-    assert type == "git"
+    if _touched is not None:
+        _touched.add(pwd(_show=False))
 
     # Update the working tree to the specified revision.
     hide = {"_show": False, "_ignore": True}
 
-    git("stash", **hide)
+    if snapshot is None or snapshot.changes:
+        git("stash", **hide)
+        _limit_stash()
     if clean:
         git("clean", "--force", "-d", "-x", _show=False)
 
-    rev = _get_sha_from_rev(rev)
+    if worktree:
+        # Branches belong to the mirror, which was already fetched
+        git("checkout", "--force", "--detach", rev, _stream=False)
+        return
+
     git("checkout", "--force", rev, _stream=False)
     git("branch", "--set-upstream-to", "origin/" + rev, **hide)
 
     if fetch:
         # if `rev` was a branch it might be tracking something older
-        git("pull", "--ff-only", "--no-rebase", **hide)
+        if settings.FETCH_TARGETED or (
+            settings.CACHE_MIRROR_FETCH and not settings.CACHE_DISABLE
+        ):
+            # the upstream branch was already fetched, so avoid contacting the remote
+            git("merge", "--ff-only", "@{upstream}", **hide)
+        else:
+            git("pull", "--ff-only", "--no-rebase", **hide)
+
+
+def _update_svn(repo, rev, *, clean=True):
+    """Import an SVN revision into the current git-svn clone and check it out.
+
+    Revisions are fetched on top of the ones imported before, so the working
+    tree is only recreated when it isn't a git-svn clone of the repository
+    or the revision is older than the ones it imported.
+    With the cache enabled, revisions are imported once into a shared mirror
+    and the working tree borrows its objects.
+    """
+    mirror = None
+    if not settings.CACHE_DISABLE:
+        mirror = mirrors.get(repo, type="git-svn")
+
+    created = _get_config("svn-remote.svn.url") != repo
+    if created:
+        _init_svn(repo)
+
+    sha = _svn_commit(rev)
+    if sha and sha == resolve("HEAD"):
+        snapshot = status("git", include_untracked=clean, include_ignored=clean)
+        assert snapshot is not None
+        if not snapshot.dirty(include_untracked=clean) and not (
+            clean and snapshot.ignored
+        ):
+            log.info("Working tree is already at r%s", rev)
+            return
+
+    if not sha:
+        if mirror:
+            _prepare_svn_mirror(mirror, repo, rev)
+            _borrow_svn_mirror(mirror)
+        else:
+            if not created and _svn_imported_after(rev):
+                # git-svn only imports revisions newer than the imported ones
+                log.info("Importing r%s again, older than the imported ones", rev)
+                _init_svn(repo)
+            gitsvn("fetch", "-r", rev)
+        if rev.isdigit():
+            sha = _svn_commit(rev, before=True)
+            if not sha:
+                raise InvalidRepository(f"Unable to import SVN revision: {rev}")
+        else:
+            sha = "refs/remotes/git-svn"
+
+    if clean:
+        git("clean", "--force", "-d", "-x", _show=False)
+    git("checkout", "--force", "--detach", sha, _stream=False)
+
+
+def _init_svn(repo):
+    """Replace the current directory with an empty git-svn clone."""
+    # completely empty current directory (remove also hidden content)
+    for root, dirs, files in os.walk(pwd(_show=False)):
+        for f in files:
+            os.unlink(os.path.join(root, f))
+        for d in dirs:
+            shutil.rmtree(os.path.join(root, d))
+    gitsvn("init", repo, ".")
+
+
+def _svn_imported_after(rev) -> bool:
+    """Determine if newer SVN revisions than a numbered one were imported."""
+    if not rev.isdigit():
+        return False
+    lines = gitsvn("find-rev", "refs/remotes/git-svn", _show=False, _ignore=True)
+    latest = lines[0] if lines else ""
+    return latest.isdigit() and int(latest) > int(rev)
+
+
+def _prepare_svn_mirror(mirror: mirrors.Mirror, repo, rev):
+    """Import SVN revisions into the cache mirror shared by git-svn clones.
+
+    The mirror imports the complete history once and then only fetches new
+    revisions when it is stale or lacks the requested revision.
+    """
+    with mirrors.locked(mirror):
+        created = not mirror.exists
+        if created:
+            # Build the mirror elsewhere so readers never see a partial copy
+            temporary = tempfile.mkdtemp(
+                prefix=os.path.basename(mirror.path) + ".",
+                dir=os.path.dirname(mirror.path),
+            )
+            try:
+                git("init", "--bare", temporary, _show=False)
+                git("-C", temporary, "svn", "init", repo, _show=False)
+                os.rename(temporary, mirror.path)
+            finally:
+                if os.path.isdir(temporary):
+                    shutil.rmtree(temporary, ignore_errors=True)
+            mirror.created_now()
+        else:
+            mirror.load()
+
+        if not created and (
+            mirror.path in _refreshed_mirrors
+            or _svn_commit(rev, path=mirror.path)
+            or not (rev.isdigit() or mirror.stale(settings.CACHE_TTL))
+        ):
+            mirror.used_now()
+            return
+
+        log.info("Importing SVN revisions into mirror: %s", mirror.path)
+        git("-C", mirror.path, "svn", "fetch")
+        _refreshed_mirrors.add(mirror.path)
+        if _touched is not None:
+            _touched.add(mirror.path)
+        mirror.refreshed_now()
+
+
+def _borrow_svn_mirror(mirror: mirrors.Mirror):
+    """Copy the imported branch of a git-svn mirror into the current clone."""
+    checkout = pwd(_show=False)
+    objects = os.path.join(mirror.path, "objects")
+    alternates = os.path.join(checkout, ".git", "objects", "info", "alternates")
+    if not mirrors.borrows(checkout, mirror.path):
+        os.makedirs(os.path.dirname(alternates), exist_ok=True)
+        with open(alternates, "a", encoding="utf-8") as file:
+            file.write(objects + "\n")
+    mirror.register(checkout)
+
+    git(
+        "fetch",
+        "--force",
+        mirror.path,
+        "+refs/remotes/git-svn:refs/remotes/git-svn",
+        _show=False,
+    )
+
+    # The revision map is rebuilt from commit messages when missing,
+    # so copying it from the mirror saves reading the whole history
+    source = os.path.join(mirror.path, "svn", "refs", "remotes", "git-svn")
+    target = os.path.join(checkout, ".git", "svn", "refs", "remotes", "git-svn")
+    os.makedirs(target, exist_ok=True)
+    for name in os.listdir(source) if os.path.isdir(source) else []:
+        if name.startswith(".rev_map."):
+            shutil.copyfile(os.path.join(source, name), os.path.join(target, name))
+
+
+def _svn_commit(rev, *, before=False, path=None) -> Optional[str]:
+    """Find the imported commit of an SVN revision number."""
+    if not rev.isdigit():
+        return None  # symbolic revisions like HEAD move
+    args = ["find-rev", f"r{rev}", "refs/remotes/git-svn"]
+    if before:
+        args.insert(1, "-B")  # the revision may not change this path
+    if path:
+        lines = git("-C", path, "svn", *args, _show=False, _ignore=True)
+    else:
+        lines = gitsvn(*args, _show=False, _ignore=True)
+    sha = lines[0] if lines else ""
+    return sha if gitdir.SHA.match(sha) else None
+
+
+def _is_current(
+    snapshot: Status, rev, *, clean: bool, fetch: bool, detached: bool = False
+) -> bool:
+    """Determine if updating the working tree to a revision would change it."""
+    if snapshot.dirty(include_untracked=clean) or (clean and snapshot.ignored):
+        return False
+
+    # Worktrees of a mirror check out branches by commit, so without fetching
+    # any commit of the branch is current like a branch that is behind
+    if detached and not fetch and snapshot.head:
+        tip = resolve(f"refs/heads/{rev}")
+        if tip:
+            return tip == snapshot.head or _is_ancestor(snapshot.head, tip)
+
+    if not detached and (
+        resolve(f"refs/heads/{rev}") or resolve(f"refs/remotes/origin/{rev}")
+    ):
+        if snapshot.branch != rev or snapshot.upstream != f"origin/{rev}":
+            return False
+        return not fetch or snapshot.head == resolve(f"refs/remotes/origin/{rev}")
+
+    return snapshot.branch is None and snapshot.head == resolve(rev + "^{commit}")
+
+
+def _is_ancestor(commit, descendant) -> bool:
+    try:
+        git("merge-base", "--is-ancestor", commit, descendant, _show=False)
+    except ShellError:
+        return False
+    return True
+
+
+def _limit_stash():
+    """Drop the oldest stash entries so forced updates can't pile them up."""
+    lines = git(
+        "rev-list", "--walk-reflogs", "--count", "refs/stash", _show=False, _ignore=True
+    )
+    try:
+        count = int(lines[0])
+    except (IndexError, ValueError):
+        return
+    for _ in range(count - STASH_LIMIT):
+        git("stash", "drop", f"stash@{{{STASH_LIMIT}}}", _show=False, _ignore=True)
 
 
 def get_url(type):
@@ -305,6 +1278,11 @@ def get_url(type):
 
     assert type == "git"
 
+    repository = gitdir.find(pwd(_show=False))
+    url = repository and repository.url()
+    if url:
+        return url
+
     return git("config", "--get", "remote.origin.url", _show=False)[0]
 
 
@@ -314,6 +1292,13 @@ def get_hash(type, short=False, _show=False):
         return "".join(filter(str.isdigit, gitsvn("info", _show=_show)[4]))
 
     assert type == "git"
+
+    if not short:
+        repository = gitdir.find(pwd(_show=False))
+        sha = repository and repository.head()
+        if sha:
+            return sha
+
     args = ["rev-parse"]
     if short:
         args.append("--short")
@@ -326,49 +1311,71 @@ def get_tag():
     return git("describe", "--tags", "--exact-match", _show=False, _ignore=True)[0]
 
 
-def is_fetch_required(type, rev):
+def is_fetch_required(type, rev, snapshot=None):
     if type == "git-svn":
         return False
 
     assert type == "git"
 
-    return rev not in (get_branch(), get_hash(type), get_tag())
+    if snapshot is None:
+        snapshot = status(type)
+
+    if rev in (snapshot.branch, snapshot.head):
+        return False
+
+    if snapshot.head is None:
+        return True
+
+    if resolve(f"refs/tags/{rev}^{{commit}}") == snapshot.head:
+        return False
+
+    # Detached worktrees of a mirror share its branches
+    return snapshot.branch is not None or (
+        resolve(f"refs/heads/{rev}") != snapshot.head
+    )
 
 
 def get_branch():
     """Get the current working tree's branch."""
+    repository = gitdir.find(pwd(_show=False))
+    branch = repository and repository.branch()
+    if branch:
+        return branch
+
     return git("rev-parse", "--abbrev-ref", "HEAD", _show=False)[0]
 
 
 def get_object_rev(object_name):
     """Get the revision associated with the object specified."""
-    log_results = git("log", "-n", "1", object_name, _show=False, _ignore=True)
-
-    commit_sha = None
-
-    if len(log_results) > 0:
-        if "commit" in log_results[0]:
-            commit_sha = log_results[0].replace("commit ", "")
-
-    return commit_sha
+    return resolve(object_name + "^{commit}")
 
 
 def _local_branch_exists(name) -> bool:
     """Check if a local branch exists."""
-    try:
-        git("rev-parse", "--verify", name, _show=False)
-        return True
-    except ShellError:
-        return False
+    return resolve(name) is not None
+
 
+def _get_sha_from_rev(rev, repo=None, filter=None):
+    """Get a rev-parse string's hash.
 
-def _get_sha_from_rev(rev):
-    """Get a rev-parse string's hash."""
+    Dates are resolved against the fetched branch without a checkout, and
+    dates safely in the past are remembered in the cache for each repository.
+    """
     if "@{" in rev:
         parts = rev.split("@")
         branch = parts[0]
         date = parts[1].strip("{}")
-        git("checkout", "--force", branch, _show=False)
+
+        mirror = None
+        if repo and not settings.CACHE_DISABLE and _is_settled(date):
+            mirror = mirrors.get(repo, settings.CACHE, filter)
+            sha = mirror.revisions.get(rev)
+            if sha and resolve(sha + "^{commit}"):
+                log.debug("Remembered %s as %s", rev, sha)
+                return sha
+
+        if resolve(f"refs/remotes/origin/{branch}"):
+            branch = f"origin/{branch}"
         rev = git(
             "rev-list",
             "-n",
@@ -378,4 +1385,28 @@ def _get_sha_from_rev(rev):
             branch,
             _show=False,
         )[0]
+
+        if mirror and mirror.exists and is_sha(rev):
+            mirror.revisions[parts[0] + "@" + parts[1]] = rev
+            mirror.save()
     return rev
+
+
+def _is_settled(date: str) -> bool:
+    """Determine if a date is far enough in the past to map to a fixed commit.
+
+    >>> _is_settled("2015-02-12 18:30:00")
+    True
+
+    >>> _is_settled("yesterday")
+    False
+
+    """
+    try:
+        timestamp = datetime.datetime.fromisoformat(date)
+    except ValueError:
+        return False  # relative dates like 'yesterday' keep moving
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()
+    age = datetime.datetime.now(datetime.timezone.utc) - timestamp
+    return age > SETTLED_AGE
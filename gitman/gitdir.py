@@ -0,0 +1,240 @@
+"""Read-only access to Git metadata without calling Git.
+
+Every function returns `None` when the answer cannot be determined from
+the files on disk so callers can fall back to the Git command-line.
+"""
+
+import mmap
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import log
+
+# Environment variables that change where or how Git reads its metadata
+OVERRIDES = [
+    "GIT_DIR",
+    "GIT_WORK_TREE",
+    "GIT_COMMON_DIR",
+    "GIT_CONFIG",
+    "GIT_CONFIG_COUNT",
+    "GIT_CONFIG_PARAMETERS",
+]
+
+SHA = re.compile(r"^[0-9a-f]{40}$|^[0-9a-f]{64}$")
+SECTION = re.compile(r'^\[\s*([\w.-]+)(?:\s+"([^"\\]*)")?\s*\]$')
+VARIABLE = re.compile(r"^([A-Za-z][\w-]*)\s*(?:=\s*(.*))?$")
+
+
+@dataclass
+class Repository:
+    """Paths describing a working tree and its Git directories."""
+
+    worktree: str
+    gitdir: str
+    commondir: str
+
+    @property
+    def config(self) -> Optional[Dict[str, List[str]]]:
+        """Parse the repository's config file into lists of values by key."""
+        return read_config(os.path.join(self.commondir, "config"))
+
+    def head(self) -> Optional[str]:
+        """Get the SHA of the checked out commit."""
+        return self.resolve("HEAD")
+
+    def branch(self) -> Optional[str]:
+        """Get the checked out branch name or 'HEAD' when detached."""
+        content = _read(os.path.join(self.gitdir, "HEAD"))
+        if content is None:
+            return None
+        if content.startswith("ref: refs/heads/"):
+            return content[len("ref: refs/heads/") :]
+        if SHA.match(content):
+            return "HEAD"
+        return None
+
+    def url(self, remote: str = "origin") -> Optional[str]:
+        """Get a remote's URL as written in the repository's config."""
+        config = self.config
+        if config is None:
+            return None
+        values = config.get(f'remote "{remote}".url')
+        return values[-1] if values else None
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Get the SHA a reference points to, following symbolic references."""
+        for _ in range(5):
+            content = self._read_ref(ref)
+            if content is None:
+                return None
+            if content.startswith("ref: "):
+                ref = content[5:]
+                continue
+            return content if SHA.match(content) else None
+        return None
+
+    def index_size(self) -> Optional[int]:
+        """Get the number of entries in the index from its header."""
+        try:
+            with open(os.path.join(self.gitdir, "index"), "rb") as index:
+                header = index.read(12)
+        except OSError:
+            return None
+        if len(header) < 12 or header[:4] != b"DIRC":
+            return None
+        return int.from_bytes(header[8:12], "big")
+
+    def _read_ref(self, ref: str) -> Optional[str]:
+        if ref == "HEAD" or not ref.startswith("refs/") or "/worktree/" in ref:
+            directory = self.gitdir
+        else:
+            directory = self.commondir
+        content = _read(os.path.join(directory, *ref.split("/")))
+        if content is None and ref.startswith("refs/"):
+            content = search_packed_refs(
+                os.path.join(self.commondir, "packed-refs"), ref
+            )
+        return content
+
+
+def find(worktree: str) -> Optional[Repository]:
+    """Locate the Git directories of a working tree's top level."""
+    if any(name in os.environ for name in OVERRIDES):
+        return None
+
+    dotgit = os.path.join(worktree, ".git")
+    if os.path.isdir(dotgit):
+        gitdir = dotgit
+    elif os.path.isfile(dotgit):
+        content = _read(dotgit)
+        if not content or not content.startswith("gitdir: "):
+            return None
+        gitdir = os.path.join(worktree, content[len("gitdir: ") :])
+    else:
+        return None
+
+    commondir = gitdir
+    content = _read(os.path.join(gitdir, "commondir"))
+    if content:
+        commondir = os.path.join(gitdir, content)
+
+    if not os.path.isfile(os.path.join(gitdir, "HEAD")):
+        return None
+    if not os.path.isdir(os.path.join(commondir, "objects")):
+        return None
+
+    repository = Repository(
+        os.path.normpath(worktree),
+        os.path.normpath(gitdir),
+        os.path.normpath(commondir),
+    )
+
+    config = repository.config
+    if config is None:
+        return None
+    if any(key in config for key in ["core.worktree", "extensions.refstorage"]):
+        log.debug("Unusual repository layout in: %s", worktree)
+        return None
+    bare = config.get("core.bare", ["false"])[-1].lower() == "true"
+    if bare and gitdir == commondir:
+        return None  # linked worktrees of a bare repository are not bare
+
+    return repository
+
+
+def search_packed_refs(path: str, ref: str) -> Optional[str]:
+    """Look up a reference in a 'packed-refs' file."""
+    try:
+        with open(path, "rb") as packed_refs:
+            data = mmap.mmap(packed_refs.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # missing or empty
+
+    with data:
+        target = ref.encode("utf-8")
+        start = 0
+        ordered = False
+        if data[:1] == b"#":
+            start = data.find(b"\n") + 1 or len(data)
+            ordered = b" sorted" in data[:start]
+
+        if ordered:
+            sha = _bisect(data, target, start, len(data))
+        else:
+            sha = None
+            for line in data[start:].split(b"\n"):
+                if line.endswith(b" " + target) and not line.startswith(b"^"):
+                    sha = line.split(b" ", 1)[0]
+                    break
+
+    return sha.decode() if sha else None
+
+
+def _bisect(data, target: bytes, low: int, high: int) -> Optional[bytes]:
+    """Binary search sorted 'packed-refs' records between two offsets."""
+    while low < high:
+        middle = (low + high) // 2
+        start = max(low, data.rfind(b"\n", low, middle) + 1)
+        end = data.find(b"\n", start)
+        if end == -1:
+            end = len(data)
+
+        if data[start : start + 1] == b"^":
+            # Peeled lines belong to the record before them
+            end = start - 1
+            start = max(low, data.rfind(b"\n", low, end) + 1)
+
+        sha, _, name = data[start:end].partition(b" ")
+        if name == target:
+            return sha
+        if name > target:
+            high = start
+        else:
+            low = end + 1
+            if data[low : low + 1] == b"^":
+                low = data.find(b"\n", low) + 1 or len(data)
+
+    return None
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return file.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def read_config(path: str) -> Optional[Dict[str, List[str]]]:
+    """Parse the simple subset of Git's config syntax written by Git itself."""
+    content = _read(path)
+    if content is None:
+        return None
+
+    config: Dict[str, List[str]] = {}
+    section = None
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line[0] in "#;":
+            continue
+
+        match = SECTION.match(line)
+        if match:
+            name, subsection = match.groups()
+            if name.lower() in {"include", "includeif"}:
+                return None
+            section = name.lower()
+            if subsection is not None:
+                section += f' "{subsection}"'
+            continue
+
+        match = VARIABLE.match(line)
+        if not match or section is None or any(c in line for c in '"\\'):
+            return None  # quoting, escapes, and continuations require Git
+        key, value = match.groups()
+        value = "true" if value is None else re.split(r"\s[#;]", value)[0].strip()
+        config.setdefault(f"{section}.{key.lower()}", []).append(value)
+
+    return config
@@ -0,0 +1,495 @@
+"""Bare repository mirrors shared between projects in the cache."""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import log
+
+from . import gitdir, settings
+from .exceptions import ShellError
+from .shell import call
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+EXTENSION = ".mirror"
+LEGACY_EXTENSION = ".reference"
+LOCK_EXTENSION = ".lock"
+METADATA = "gitman.json"
+REFERENCES = "gitman-references"
+TIMES = ("created", "used", "refreshed", "maintained")
+
+SCP_LIKE = re.compile(r"^(?:[^@/]+@)?(?P<host>[^:/]{2,}):(?!//)(?P<path>.*)$")
+
+_locks: dict = {}
+_locks_lock = threading.Lock()
+_held = threading.local()
+
+
+@dataclass
+class Mirror:
+    """Metadata describing a cached mirror of a remote repository."""
+
+    path: str
+    url: str = ""
+    created: float = 0.0
+    used: float = 0.0
+    refreshed: float = 0.0
+    maintained: float = 0.0
+    size: int = 0
+    revisions: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def exists(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def load(self):
+        """Read metadata saved alongside the mirror."""
+        try:
+            with open(self._metadata_path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        names = {item.name for item in fields(self)} - {"path"}
+        for name, value in data.items():
+            if name in names:
+                setattr(self, name, value)
+
+    def save(self):
+        """Write metadata alongside the mirror.
+
+        Metadata saved by other threads and processes since it was loaded is
+        merged, keeping the latest times and every remembered revision.
+        """
+        with locked(self):
+            saved = Mirror(self.path)
+            saved.load()
+            for name in TIMES:
+                setattr(self, name, max(getattr(self, name), getattr(saved, name)))
+            self.url = self.url or saved.url
+            self.size = self.size or saved.size
+            self.revisions = {**saved.revisions, **self.revisions}
+            self._write()
+
+    def _write(self):
+        data = asdict(self)
+        del data["path"]
+        temporary = None
+        try:
+            # Each writer needs its own file for the replacement to be atomic
+            descriptor, temporary = tempfile.mkstemp(
+                prefix=METADATA + ".", suffix=".tmp", dir=self.path
+            )
+            with open(descriptor, "w", encoding="utf-8") as file:
+                json.dump(data, file, indent=2, sort_keys=True)
+            os.replace(temporary, self._metadata_path)
+        except OSError as exception:
+            log.debug("Unable to save mirror metadata: %s", exception)
+            if temporary:
+                with suppress(OSError):
+                    os.remove(temporary)
+
+    def stale(self, ttl: int) -> bool:
+        """Determine if the mirror was last fetched more than `ttl` seconds ago."""
+        return time.time() - (self.refreshed or self.created) >= ttl
+
+    def created_now(self):
+        """Record a newly created mirror."""
+        self.created = self.used = self.refreshed = time.time()
+        self.track()
+        self.size = measure(self.path)
+        self.save()
+
+    def track(self):
+        """Start registering the checkouts that use the mirror."""
+        with suppress(OSError), open(self._references_path, "a", encoding="utf-8"):
+            pass
+
+    def used_now(self):
+        """Record that the mirror was used by a checkout."""
+        self.used = time.time()
+        if not self.created:
+            self.created = self.used
+            self.size = measure(self.path)
+        self.save()
+
+    def refreshed_now(self):
+        """Record that new objects were fetched into the mirror."""
+        self.refreshed = time.time()
+        self.size = measure(self.path)
+        self.save()
+
+    def register(self, checkout: str):
+        """Record a checkout that borrows objects from the mirror."""
+        checkout = os.path.abspath(checkout)
+        if checkout in self.references():
+            return
+        try:
+            with open(self._references_path, "a", encoding="utf-8") as file:
+                file.write(checkout + "\n")
+        except OSError as exception:
+            log.debug("Unable to register mirror reference: %s", exception)
+
+    def references(self) -> List[str]:
+        """Get every checkout registered as borrowing objects from the mirror."""
+        try:
+            with open(self._references_path, encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except OSError:
+            return []
+        return list(dict.fromkeys(line for line in lines if line))
+
+    @property
+    def tracked(self) -> bool:
+        """Determine if checkouts using the mirror have been registered."""
+        return os.path.isfile(self._references_path)
+
+    def borrowers(self) -> List[str]:
+        """Get the registered checkouts that still depend on the mirror."""
+        return [path for path in self.references() if borrows(path, self.path)]
+
+    def maintained_now(self):
+        """Record that the mirror was repacked and its indexes were written."""
+        self.maintained = time.time()
+        self.size = measure(self.path)
+        self.save()
+
+    @property
+    def needs_maintenance(self) -> bool:
+        """Determine if objects were fetched since the mirror was maintained."""
+        return self.maintained < max(self.refreshed, self.created)
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.splitext(self.path)[0] + LOCK_EXTENSION
+
+    @property
+    def _references_path(self) -> str:
+        return os.path.join(self.path, REFERENCES)
+
+    @property
+    def _metadata_path(self) -> str:
+        return os.path.join(self.path, METADATA)
+
+
+def normalize(url: str) -> str:
+    """Reduce different spellings of a repository URL to one form.
+
+    >>> normalize("https://GitHub.com/owner/repo.git/")
+    'github.com/owner/repo'
+
+    >>> normalize("git@github.com:owner/repo.git")
+    'github.com/owner/repo'
+
+    >>> normalize("ssh://git@github.com:22/owner/repo")
+    'github.com/owner/repo'
+
+    """
+    url = url.strip()
+
+    match = SCP_LIKE.match(url)
+    if match and "://" not in url:
+        host, path = match.group("host"), match.group("path")
+    elif "://" in url:
+        parts = urlsplit(url)
+        if parts.scheme == "file":
+            host, path = "", os.path.normpath(parts.path)
+        else:
+            host, path = parts.hostname or "", parts.path
+    else:
+        host, path = "", os.path.normcase(os.path.abspath(url))
+
+    path = re.sub(r"/+", "/", path.replace("\\", "/")).rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+
+    if host:
+        return host.lower() + "/" + path.lstrip("/")
+    return path
+
+
+def key(url: str, filter: Optional[str] = None, type: str = "git") -> str:
+    """Get the cache entry name for a repository URL.
+
+    >>> key("https://github.com/owner/repo.git")
+    'repo-aaa7182dfb6cff7f'
+
+    Partial clones are kept apart from complete mirrors:
+
+    >>> key("https://github.com/owner/repo.git", filter="blob:none")
+    'repo-7baa0fdbf2f166ab'
+
+    Imports of other version control systems are kept apart as well:
+
+    >>> key("https://github.com/owner/repo.git", type="git-svn")
+    'repo-219c814dbeb72230'
+
+    """
+    normalized = normalize(url)
+    name = normalized.rsplit("/", 1)[-1] or "repo"
+    if filter:
+        normalized += "#filter=" + filter
+    if type != "git":
+        normalized += "#type=" + type
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+    return f"{name}-{digest}"
+
+
+def get(
+    url: str,
+    cache: str = settings.CACHE,
+    filter: Optional[str] = None,
+    type: str = "git",
+) -> Mirror:
+    """Get the mirror for a repository, adopting a legacy mirror if present."""
+    mirror = Mirror(os.path.join(cache, key(url, filter, type) + EXTENSION))
+    if not mirror.exists and not filter and type == "git":
+        _migrate(url, cache, mirror)
+    mirror.load()
+    mirror.url = mirror.url or url
+    return mirror
+
+
+def scan(cache: str = settings.CACHE) -> List[Mirror]:
+    """Find every mirror in the cache, including unmigrated legacy mirrors."""
+    found = []
+    with suppress(OSError):
+        for entry in os.scandir(cache):
+            if not entry.name.endswith((EXTENSION, LEGACY_EXTENSION)):
+                continue
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            mirror = Mirror(entry.path)
+            mirror.load()
+            if not mirror.used:
+                mirror.created = mirror.used = entry.stat().st_mtime
+            mirror.size = mirror.size or measure(mirror.path)
+            found.append(mirror)
+    return found
+
+
+def collect(
+    cache: str = settings.CACHE,
+    max_size: Optional[int] = None,
+    *,
+    dissociate: bool = False,
+) -> List[Mirror]:
+    """Delete least recently used mirrors until the cache fits a size budget.
+
+    Only mirrors that no registered checkout depends on are deleted, and
+    mirrors created before checkouts were registered are kept. To fit the
+    budget, `dissociate` first copies the objects into each checkout and
+    also deletes mirrors whose checkouts are unknown.
+    Mirrors with linked worktrees are always kept, like mirrors locked
+    while a checkout is cloned from them.
+    """
+    candidates = sorted(scan(cache), key=lambda mirror: mirror.used)
+    total = sum(mirror.size for mirror in candidates)
+    log.info("Cache contains %s mirrors using %s bytes", len(candidates), total)
+
+    removed = []
+    for mirror in candidates:
+        if max_size is not None and total <= max_size:
+            break
+        if not mirror.tracked and (max_size is None or not dissociate):
+            log.info("Skipped mirror used by unknown checkouts: %s", mirror.path)
+            continue
+        with locked(mirror, wait=False) as acquired:
+            if not acquired:
+                log.info("Skipped mirror in use: %s", mirror.path)
+                continue
+            checkouts = mirror.borrowers()
+            if checkouts and (
+                max_size is None
+                or not dissociate
+                # worktrees cannot be separated from the mirror
+                or any(attached(checkout, mirror.path) for checkout in checkouts)
+            ):
+                log.info(
+                    "Skipped mirror used by %s checkouts: %s",
+                    len(checkouts),
+                    mirror.path,
+                )
+                continue
+            try:
+                for checkout in checkouts:
+                    _dissociate(checkout, mirror.path)
+                _remove(mirror, cache)
+            except (OSError, ShellError) as exception:
+                log.warning("Unable to delete mirror %s: %s", mirror.path, exception)
+                continue
+        total -= mirror.size
+        removed.append(mirror)
+
+    return removed
+
+
+def borrows(checkout: str, path: str) -> bool:
+    """Determine if a checkout is a worktree of a mirror or uses its objects."""
+    return attached(checkout, path) or any(
+        os.path.realpath(alternate) == os.path.realpath(os.path.join(path, "objects"))
+        for alternate in _alternates(checkout)
+    )
+
+
+def attached(checkout: str, path: str) -> bool:
+    """Determine if a checkout is a linked worktree of a mirror."""
+    repository = gitdir.find(checkout)
+    if repository is None or repository.gitdir == repository.commondir:
+        return False
+    return os.path.realpath(repository.commondir) == os.path.realpath(path)
+
+
+@contextmanager
+def locked(mirror: Mirror, *, wait: bool = True):
+    """Hold an exclusive lock on a mirror while it is modified.
+
+    The lock is shared by threads and by other processes using the same
+    cache. Reading from a mirror does not require it. Without `wait`, the
+    context yields `False` instead of blocking when the lock is taken.
+    A thread already holding the lock can take it again.
+    """
+    held = vars(_held).setdefault("paths", set())
+    if mirror.path in held:
+        yield True
+        return
+
+    with _locks_lock:
+        lock = _locks.setdefault(mirror.path, threading.Lock())
+
+    if not lock.acquire(blocking=wait):
+        yield False
+        return
+    try:
+        if fcntl is None:
+            with _holding(held, mirror.path):
+                yield True
+            return
+
+        os.makedirs(os.path.dirname(mirror.lock_path) or ".", exist_ok=True)
+        with open(mirror.lock_path, "a", encoding="utf-8") as file:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if not wait:
+                    yield False
+                    return
+                log.info("Waiting for another process to release %s", file.name)
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                with _holding(held, mirror.path):
+                    yield True
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+    finally:
+        lock.release()
+
+
+@contextmanager
+def _holding(held: set, path: str):
+    held.add(path)
+    try:
+        yield
+    finally:
+        held.discard(path)
+
+
+def measure(path: str) -> int:
+    """Calculate the disk usage of a directory in bytes."""
+    total = 0
+    with suppress(OSError):
+        for entry in os.scandir(path):
+            with suppress(OSError):
+                if entry.is_dir(follow_symlinks=False):
+                    total += measure(entry.path)
+                else:
+                    total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+def _alternates_path(checkout: str) -> str:
+    repository = gitdir.find(checkout)
+    gitpath = repository.commondir if repository else os.path.join(checkout, ".git")
+    return os.path.join(gitpath, "objects", "info", "alternates")
+
+
+def _alternates(checkout: str) -> List[str]:
+    try:
+        with open(_alternates_path(checkout), encoding="utf-8") as file:
+            return [line.strip() for line in file if line.strip()]
+    except OSError:
+        return []
+
+
+def _dissociate(checkout: str, path: str):
+    """Copy borrowed objects into a checkout so it no longer needs a mirror."""
+    log.info("Copying objects from %s into %s", path, checkout)
+    call("git", "-C", checkout, "repack", "-a", "-d", _show=False)
+    remaining = [
+        alternate
+        for alternate in _alternates(checkout)
+        if os.path.realpath(alternate)
+        != os.path.realpath(os.path.join(path, "objects"))
+    ]
+    alternates = _alternates_path(checkout)
+    if remaining:
+        with open(alternates, "w", encoding="utf-8") as file:
+            file.write("\n".join(remaining) + "\n")
+    else:
+        os.remove(alternates)
+
+
+def _remove(mirror: Mirror, cache: str):
+    log.info("Deleting mirror: %s", mirror.path)
+    for entry in os.scandir(cache):
+        if entry.name.endswith(LEGACY_EXTENSION) and entry.is_symlink():
+            if os.path.realpath(entry.path) == os.path.realpath(mirror.path):
+                os.remove(entry.path)
+    shutil.rmtree(mirror.path)
+
+
+def _migrate(url: str, cache: str, mirror: Mirror):
+    """Move a mirror from the name-based layout to the URL-based layout."""
+    name = url.split("/")[-1]
+    if name.endswith(".git"):
+        name = name[:-4]
+    legacy = os.path.join(cache, name + LEGACY_EXTENSION)
+    if os.path.islink(legacy) or not os.path.isdir(legacy):
+        return
+
+    config = gitdir.read_config(os.path.join(legacy, "config")) or {}
+    urls = config.get('remote "origin".url')
+    if not urls or normalize(urls[-1]) != normalize(url):
+        log.debug("Legacy mirror %s belongs to another repository", legacy)
+        return
+
+    log.info("Migrating legacy mirror %s to %s", legacy, mirror.path)
+    try:
+        os.rename(legacy, mirror.path)
+    except OSError as exception:
+        log.debug("Unable to migrate legacy mirror: %s", exception)
+        return
+
+    # Existing checkouts reference the old location in their alternates
+    try:
+        os.symlink(mirror.path, legacy, target_is_directory=True)
+    except OSError as exception:
+        log.debug("Unable to link legacy mirror location: %s", exception)
+        os.rename(mirror.path, legacy)
+        return
+
+    mirror.url = urls[-1]
+    mirror.track()
+    mirror.used_now()
@@ -1,5 +1,6 @@
 import os
-from typing import Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
 
 import log
 from datafiles import datafile, field
@@ -40,6 +41,17 @@ class Config:
         """Get the full path to the log file."""
         return os.path.normpath(os.path.join(self.location_path, "gitman.log"))
 
+    @property
+    def scripts_log_path(self) -> str:
+        """Get the full path to the directory of script output files."""
+        return os.path.normpath(os.path.join(self.location_path, ".logs"))
+
+    @property
+    def trash_path(self) -> str:
+        """Get the full path to the directory of dependencies being deleted."""
+        assert self.root
+        return os.path.normpath(os.path.join(self.root, ".gitman-trash"))
+
     @property
     def location_path(self) -> str:
         """Get the full path to the dependency storage location."""
@@ -80,6 +92,8 @@ class Config:
         clean: bool = True,
         skip_changes: bool = False,
         skip_default_group: bool = False,
+        jobs: int = 1,
+        keep_going: bool = False,
     ) -> int:
         """Download or update the specified dependencies."""
         if depth == 0:
@@ -97,51 +111,136 @@ class Config:
         common.newline()
         common.indent()
 
-        count = 0
+        selected = []
         for source in sources:
             if source.name in sources_filter:
                 sources_filter.remove(source.name)
+                selected.append(source)
             else:
                 log.info("Skipped dependency: %s", source.name)
-                continue
 
-            source.update_files(
-                force=force,
-                force_interactive=force_interactive,
-                fetch=fetch,
-                clean=clean,
-                skip_changes=skip_changes,
+        options = {
+            "force": force,
+            "force_interactive": force_interactive,
+            "fetch": fetch,
+            "clean": clean,
+            "skip_changes": skip_changes,
+        }
+        concurrent = jobs > 1 and len(selected) > 1 and not force_interactive
+        if concurrent:
+            failures = self._update_files_concurrently(
+                selected, jobs=jobs, keep_going=keep_going, **options
             )
-            assert self.root, f"Missing root: {self}"
-            source.create_links(self.root, force=force)
-            common.newline()
-            count += 1
+        else:
+            failures = {}
 
-            config = load_config(search=False)
-            if config:
-                common.indent()
-                count += config.install_dependencies(
-                    depth=None if depth is None else max(0, depth - 1),
-                    update=update and recurse,
-                    recurse=recurse,
-                    force=force,
-                    fetch=fetch,
-                    clean=clean,
-                    skip_changes=skip_changes,
-                    skip_default_group=skip_default_group,
-                )
-                common.dedent()
+        count = 0
+        for source in selected:
+            if source.name in failures:
+                continue
+
+            try:
+                if concurrent:
+                    shell.cd(source.name, _show=False)
+                else:
+                    source.update_files(**options)
+                assert self.root, f"Missing root: {self}"
+                source.create_links(self.root, force=force)
+                if not concurrent:
+                    common.newline()
+                count += 1
+
+                config = load_config(search=False)
+                if config:
+                    common.indent()
+                    count += config.install_dependencies(
+                        depth=None if depth is None else max(0, depth - 1),
+                        update=update and recurse,
+                        recurse=recurse,
+                        force=force,
+                        fetch=fetch,
+                        clean=clean,
+                        skip_changes=skip_changes,
+                        skip_default_group=skip_default_group,
+                        jobs=jobs,
+                        keep_going=keep_going,
+                    )
+                    common.dedent()
+
+            except exceptions.DependencyFailures as exception:
+                failures.update(exception.errors)
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if not keep_going:
+                    raise
+                common.show(str(exception), color="error")
+                common.newline()
+                assert source.name
+                failures[source.name] = exception
 
             shell.cd(self.location_path, _show=False)
 
         common.dedent()
 
+        if failures:
+            msg = "Failed to install {} dependencies: {}".format(
+                len(failures), ", ".join(sorted(failures))
+            )
+            raise exceptions.DependencyFailures(msg, errors=failures)
+
         if sources_filter:
             log.error("No such dependency: %s", " ".join(sources_filter))
             return 0
 
         return count
 
+    def _update_files_concurrently(
+        self, sources: List[Source], *, jobs: int, keep_going: bool, **options
+    ) -> Dict[str, Exception]:
+        """Update the files of independent sources using a pool of workers."""
+        log.info("Updating %s dependencies with %s jobs", len(sources), jobs)
+
+        def update_files(source):
+            with common.buffered() as output, shell.isolated(self.location_path):
+                try:
+                    source.update_files(**options)
+                except Exception as exception:  # pylint: disable=broad-exception-caught
+                    return output, exception
+            return output, None
+
+        failures: Dict[str, Exception] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = {
+                    executor.submit(update_files, source): source for source in sources
+                }
+                try:
+                    for future in as_completed(futures):
+                        if future.cancelled():
+                            continue
+                        output, exception = future.result()
+                        common.flush(output)
+                        if exception:
+                            common.show(str(exception), color="error")
+                            name = futures[future].name
+                            assert name
+                            failures[name] = exception
+                        common.newline()
+                        if exception and not keep_going:
+                            for pending in futures:
+                                pending.cancel()
+                except KeyboardInterrupt:
+                    for pending in futures:
+                        pending.cancel()
+                    shell.interrupt()
+                    raise
+        finally:
+            shell.resume()
+
+        if failures and not keep_going:
+            raise next(iter(failures.values()))
+
+        return failures
+
     @preserve_cwd
     def run_scripts(
         self,
@@ -178,7 +277,11 @@ class Config:
                     count += config.run_scripts(depth=remaining_depth, force=force)
                     common.dedent()
 
-                source.run_scripts(force=force, show_shell_stdout=show_shell_stdout)
+                source.run_scripts(
+                    force=force,
+                    show_shell_stdout=show_shell_stdout,
+                    log_path=os.path.join(self.scripts_log_path, source.name + ".log"),
+                )
                 count += 1
 
                 shell.cd(self.location_path, _show=False)
@@ -301,24 +404,43 @@ class Config:
 
         return count
 
-    def uninstall_dependencies(self):
-        """Delete the dependency storage location."""
+    def uninstall_dependencies(self, background: bool = False):
+        """Delete the dependency storage location.
+
+        In the background, the location is moved aside to be deleted by
+        `purge_trash` instead.
+        """
         shell.cd(self.root)
-        shell.rm(self.location_path)
+        if background:
+            shell.trash(self.location_path, self.trash_path)
+        else:
+            shell.rm(self.location_path)
         common.newline()
 
-    def clean_dependencies(self):
+    def clean_dependencies(self, background: bool = False):
         """Delete the dependency storage location."""
         for path in self.get_top_level_dependencies():
 
             if path == self.location_path:
                 log.info("Skipped dependency: %s", path)
+            elif background:
+                shell.trash(path, self.trash_path)
             else:
                 shell.rm(path)
 
             common.newline()
 
         shell.rm(self.log_path)
+        if background:
+            shell.trash(self.scripts_log_path, self.trash_path)
+        else:
+            shell.rm(self.scripts_log_path)
+
+    def purge_trash(self):
+        """Delete dependencies that were moved aside in a detached program."""
+        if os.path.isdir(self.trash_path):
+            log.info("Deleting dependencies moved aside: %s", self.trash_path)
+            shell.purge(self.trash_path)
 
     def get_top_level_dependencies(self):
         """Yield the path, repository, and hash of top-level dependencies."""
@@ -5,7 +5,7 @@ from typing import List, Optional
 
 import log
 
-from .. import common, exceptions, git, shell
+from .. import common, exceptions, git, settings, shell
 
 Identity = namedtuple("Identity", ["path", "url", "rev"])
 
@@ -27,6 +27,9 @@ class Source:
     | `rev` | SHA, tag, or branch to checkout | Yes | `"main"`|
     | `type` | `"git"` or `"git-svn"` | No | `"git"` |
     | `params` | Additional arguments for `clone` | No | `null` |
+    | `filter` | Omits objects from a partial clone | No | `null` |
+    | `checkout` | `"clone"` or `"worktree"` | No | `"clone"` |
+    | `performance` | Tunes Git for checkouts with many files | No | `null` |
     | `sparse_paths` | Controls partial checkout | No | `[]` |
     | `links` | Creates symlinks within a project | No | `[]` |
     | `scripts` | Shell commands to run after checkout | No | `[]` |
@@ -46,6 +49,47 @@ class Source:
     params: --recurse-submodules
     ```
 
+    ### Filter
+
+    Large repositories can be cloned without the contents of every revision.
+    Missing objects are downloaded when a checkout needs them:
+
+    ```
+    # Download file contents on demand:
+    filter: blob:none
+
+    # Download directories and file contents on demand:
+    filter: tree:0
+    ```
+
+    ### Checkout
+
+    By default, each dependency is a separate clone that borrows objects from
+    the cache. A worktree of the cache mirror can be checked out instead so
+    that repeated dependencies share refs and are fetched only once:
+
+    ```
+    checkout: worktree
+    ```
+
+    Worktrees are always on a detached `HEAD`, require the cache, and are not
+    used for sources with `sparse_paths`.
+
+    ### Performance
+
+    Checkouts with 100,000 or more files are measured after they are first
+    cloned and configured to use an untracked cache, parallel checkout and
+    index reading, commit-graphs, and the file system monitor where available.
+    The profile can be chosen for a source instead of measuring it:
+
+    ```
+    # Always tune the checkout:
+    performance: large
+
+    # Never tune the checkout:
+    performance: default
+    ```
+
     ### Sparse Paths
 
     See [using sparse checkouts][using-sparse-checkouts] for more information.
@@ -84,6 +128,9 @@ class Source:
 
     type: str = "git"
     params: Optional[str] = None
+    filter: Optional[str] = None
+    checkout: str = "clone"
+    performance: Optional[str] = None
     sparse_paths: List[str] = field(default_factory=list)
     links: List[Link] = field(default_factory=list)
 
@@ -138,9 +185,10 @@ class Source:
 
         # Clone the repository if needed
         assert self.name
+        path = os.path.join(shell.pwd(_show=False), self.name)
         valid_checkout_dir = False
-        if os.path.isdir(self.name):
-            valid_checkout_dir = len(os.listdir(self.name)) == 0
+        if os.path.isdir(path):
+            valid_checkout_dir = len(os.listdir(path)) == 0
         else:
             valid_checkout_dir = True
 
@@ -152,6 +200,8 @@ class Source:
                 sparse_paths=self.sparse_paths,
                 rev=self.rev,
                 user_params=self.clone_params_if_any(),
+                filter=self.filter,
+                checkout=self.checkout,
             )
 
         # Enter the working tree
@@ -164,23 +214,38 @@ class Source:
                 raise self._invalid_repository
 
         # Check for uncommitted changes
+        snapshot = None
         if not force:
             log.debug("Confirming there are no uncommitted changes...")
+            # Ignored files are included so the update can reuse the snapshot
+            try:
+                snapshot = git.status(
+                    self.type, include_untracked=clean, include_ignored=clean
+                )
+            except exceptions.ShellError as exc:
+                # Checking for changes again reports them as uncommitted
+                log.debug("Unable to check working tree: %s", exc)
             if skip_changes:
                 if git.changes(
-                    self.type, include_untracked=clean, display_status=False
+                    self.type,
+                    include_untracked=clean,
+                    display_status=False,
+                    snapshot=snapshot,
                 ):
                     common.show(
-                        f"Skipped update due to uncommitted changes in {os.getcwd()}",
+                        f"Skipped update due to uncommitted changes in {path}",
                         color="git_changes",
                     )
                     return
             elif force_interactive:
                 if git.changes(
-                    self.type, include_untracked=clean, display_status=False
+                    self.type,
+                    include_untracked=clean,
+                    display_status=False,
+                    snapshot=snapshot,
                 ):
                     common.show(
-                        f"Uncommitted changes found in {os.getcwd()}",
+                        f"Uncommitted changes found in {path}",
                         color="git_changes",
                     )
 
@@ -190,28 +255,46 @@ class Source:
                             break
                         if response in ("n", ""):
                             common.show(
-                                f"Skipped update in {os.getcwd()}", color="git_changes"
+                                f"Skipped update in {path}",
+                                color="git_changes",
                             )
                             return
 
             else:
-                if git.changes(self.type, include_untracked=clean):
+                if git.changes(self.type, include_untracked=clean, snapshot=snapshot):
                     raise exceptions.UncommittedChanges(
-                        f"Uncommitted changes in {os.getcwd()}"
+                        f"Uncommitted changes in {path}"
                     )
 
         # Fetch the desired revision
-        if fetch or git.is_fetch_required(self.type, self.rev):
-            git.fetch(self.type, self.repo, self.name, rev=self.rev)
+        if fetch or git.is_fetch_required(self.type, self.rev, snapshot=snapshot):
+            git.fetch(
+                self.type,
+                self.repo,
+                self.name,
+                rev=self.rev,
+                filter=self.filter,
+                refresh=fetch,
+            )
 
         # Re-apply sparse-checkout paths in case they changed since initial clone
         if self.sparse_paths and self.sparse_paths[0]:
-            git.apply_sparse_checkout(self.sparse_paths)
+            if git.apply_sparse_checkout(self.sparse_paths):
+                snapshot = None
 
         # Update the working tree to the desired revision
         git.update(
-            self.type, self.repo, self.name, fetch=fetch, clean=clean, rev=self.rev
+            self.type,
+            self.repo,
+            self.name,
+            fetch=fetch,
+            clean=clean,
+            rev=self.rev,
+            filter=self.filter,
+            snapshot=snapshot,
         )
+        if self.type == "git":
+            git.tune(self.performance or settings.PERFORMANCE)
 
     def create_links(self, root: str, *, force: bool = False):
         """Create links from the source to target directory."""
@@ -224,7 +307,12 @@ class Source:
             source = os.path.join(relpath, os.path.normpath(link.source))
             create_sym_link(source, target, force=force)
 
-    def run_scripts(self, force: bool = False, show_shell_stdout: bool = False):
+    def run_scripts(
+        self,
+        force: bool = False,
+        show_shell_stdout: bool = False,
+        log_path: Optional[str] = None,
+    ):
         log.info("Running install scripts...")
 
         # Enter the working tree
@@ -237,10 +325,14 @@ class Source:
             common.newline()
             return
 
-        # Run all scripts
+        # Run all scripts, keeping their complete output out of memory
+        if log_path and os.path.exists(log_path):
+            os.remove(log_path)
         for script in self.scripts:
             try:
-                shell.call(script, _shell=True, _stream=show_shell_stdout)
+                shell.call(
+                    script, _shell=True, _stream=show_shell_stdout, _log=log_path
+                )
             except exceptions.ShellError as exc:
                 if show_shell_stdout:
                     common.show("(script returned an error)", color="shell_error")
@@ -251,7 +343,9 @@ class Source:
                     log.debug("Ignored error from call to '%s'", cmd)
                 else:
                     msg = "Command '{}' failed in {}".format(cmd, os.getcwd())
-                    raise exceptions.ScriptFailure(msg)
+                    if exc.log:
+                        msg += "\nThe complete output was saved to: " + exc.log
+                    raise exceptions.ScriptFailure(msg, log=exc.log)
         common.newline()
 
     def apply_patches(self, topdir: str, skip: bool = False):
@@ -310,10 +404,15 @@ class Source:
 
             path = os.getcwd()
             url = git.get_url(self.type)
+            try:
+                snapshot = git.status(self.type, _show=not skip_changes)
+            except exceptions.ShellError:
+                snapshot = None
             if git.changes(
                 self.type,
                 display_status=not allow_dirty and not skip_changes,
                 _show=not skip_changes,
+                snapshot=snapshot,
             ):
 
                 if allow_dirty:
@@ -332,7 +431,10 @@ class Source:
                 msg = "Uncommitted changes in {}".format(os.getcwd())
                 raise exceptions.UncommittedChanges(msg)
 
-            rev = git.get_hash(self.type, _show=True)
+            if snapshot:
+                rev = snapshot.head
+            else:
+                rev = git.get_hash(self.type, _show=True)
             common.show(rev, color="git_rev", log=False)
             common.newline()
             return Identity(path, url, rev)
@@ -375,6 +477,9 @@ class Source:
             repo=self.repo,
             name=self.name,
             rev=rev,
+            filter=self.filter,
+            checkout=self.checkout,
+            performance=self.performance,
             links=self.links,
             scripts=self.scripts,
             patches=self.patches,
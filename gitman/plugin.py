@@ -42,6 +42,20 @@ def main(args=None):
         action="store_true",
         help="delete ignored files when updating dependencies",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=common.positive_int,
+        default=1,
+        metavar="NUM",
+        help="number of dependencies to update in parallel",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        dest="keep_going",
+        help="continue past failed dependencies and report them at the end",
+    )
 
     # Options group
     group = parser.add_mutually_exclusive_group()
@@ -129,6 +143,11 @@ def main(args=None):
         default=False,
         help="keep top level folder location",
     )
+    parser.add_argument(
+        "--background",
+        action="store_true",
+        help="move dependencies aside and delete them in the background",
+    )
 
     # Parse arguments
     namespace = parser.parse_args(args=args)
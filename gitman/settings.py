@@ -6,6 +6,23 @@ import os
 # Cache settings
 CACHE = os.path.expanduser(os.getenv("GITMAN_CACHE", "~/.gitcache"))
 CACHE_DISABLE = bool(os.getenv("GITMAN_CACHE_DISABLE"))
+CACHE_TTL = int(os.getenv("GITMAN_CACHE_TTL", "3600"))
+CACHE_MIRROR_FETCH = bool(os.getenv("GITMAN_CACHE_MIRROR_FETCH"))
+CACHE_MAX_SIZE = os.getenv("GITMAN_CACHE_MAX_SIZE", "")
+CACHE_MAINTENANCE = int(os.getenv("GITMAN_CACHE_MAINTENANCE", "0"))
+
+# Clone settings
+CLONE_STRATEGY = os.getenv("GITMAN_CLONE_STRATEGY", "full")
+
+# Checkout settings
+PERFORMANCE = os.getenv("GITMAN_PERFORMANCE", "auto")
+
+# Fetch settings
+FETCH_TARGETED = bool(os.getenv("GITMAN_FETCH_TARGETED"))
+
+# Maintenance settings
+MAINTENANCE_TIME_LIMIT = int(os.getenv("GITMAN_MAINTENANCE_TIME_LIMIT", "60"))
+MAINTENANCE_DETACH = bool(os.getenv("GITMAN_MAINTENANCE_DETACH"))
 
 # Logging settings
 DEFAULT_LOGGING_FORMAT = "%(message)s"
@@ -1,7 +1,17 @@
 """Utilities to call shell programs."""
 
+import collections
+import functools
+import io
+import logging
 import os
+import stat
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from typing import Dict, List, Optional, Tuple
 
 import log
 
@@ -10,9 +20,27 @@ from .exceptions import ShellError
 
 CMD_PREFIX = "$ "
 OUT_PREFIX = "> "
+TAIL_LINES = 100
+RM_WORKERS = 8
+TRASH_ATTEMPTS = 3
 
+_local = threading.local()
+_config: dict = {}
+_processes: set = set()
+_processes_lock = threading.Lock()
+_interrupted = threading.Event()
+_logger = logging.getLogger(__name__)
 
-def call(name, *args, _show=True, _stream=True, _shell=False, _ignore=False):
+
+def call(
+    name,
+    *args,
+    _show=True,
+    _stream=True,
+    _shell=False,
+    _ignore=False,
+    _log: Optional[str] = None,
+):
     """Call a program with arguments.
 
     :param name: name of program to call
@@ -23,85 +51,347 @@ def call(name, *args, _show=True, _stream=True, _shell=False, _ignore=False):
                    a Windows shell command (i.e: dir, echo) needs a real shell
                    but not a regular program (i.e: calc, git)
     :param _ignore: ignore non-zero return codes
+    :param _log: append the complete output to this file and only keep
+                 the last `TAIL_LINES` lines in memory
     """
     if not _show:
         _stream = False
 
-    program = show(name, *args, stdout=_show)
+    cwd = getattr(_local, "cwd", None)
+    if cwd and _interrupted.is_set():
+        raise KeyboardInterrupt
 
-    # PyInstaller saves the original value to *_ORIG, then modifies the search
-    # path so that the bundled libraries are found first by the bundled code.
-    # But if your code executes a system program, you often do not want that
-    # this system program loads your bundled libraries (that are maybe not
-    # compatible with your system program) - it rather should load the correct
-    # libraries from the system locations like it usually does.
-    # Thus you need to restore the original path before creating the subprocess
-    # with the system program
-    # https://github.com/pyinstaller/pyinstaller/blob/483c819d6a256b58db6740696a901bd41c313f0c/doc/runtime-information.rst#ld_library_path--libpath-considerations
-    env = dict(os.environ)  # make a copy of the environment
-    lp_key = "LD_LIBRARY_PATH"  # for Linux and *BSD.
-    lp_orig = env.get(lp_key + "_ORIG")  # pyinstaller >= 20160820 has this
-    if lp_orig is not None:
-        env[lp_key] = lp_orig  # restore the original, unmodified value
-    else:
-        env.pop(lp_key, None)  # last resort: remove the env var
+    debug = _logger.isEnabledFor(logging.DEBUG)
+    program = show(name, *args, stdout=_show) if _show or debug else ""
 
-    command = (
-        subprocess.Popen(  # pylint: disable=subprocess-run-check,consider-using-with
-            name if _shell else [name, *args],
-            encoding="utf-8",
-            universal_newlines=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            shell=_shell,
-            env=env,
+    command = name if _shell else [name, *args]
+    if _log:
+        program = program or " ".join([name, *args])
+        returncode, complete_output = _run_logged(
+            command, cwd, _shell, stream=_stream, path=_log, program=program
         )
-    )
-
-    # Poll process.stdout to show stdout live
-    complete_output = []
-    while True:
-        assert command.stdout
-        output = command.stdout.readline()
-        if output == "" and command.poll() is not None:
-            break
-
-        if output != "":
-            output = output.strip()
-        else:
-            continue
-
-        complete_output.append(output)
-        if _stream:
-            common.show(output, color="shell_output")
-        else:
-            log.debug(OUT_PREFIX + output)
+    elif _stream:
+        returncode, complete_output = _run_streamed(command, cwd, _shell)
+    else:
+        returncode, complete_output = _run(command, cwd, _shell)
+        if debug and complete_output:
+            log.debug(OUT_PREFIX + ("\n" + OUT_PREFIX).join(complete_output))
 
-    if command.returncode == 0:
+    if returncode == 0:
         return complete_output
 
     if _ignore:
         log.debug("Ignored error from call to '%s'", name)
         return complete_output
 
+    program = program or " ".join([name, *args])
     message = (
         "An external program call failed." + "\n\n"
-        "In working directory: " + os.getcwd() + "\n\n"
+        "In working directory: " + (cwd or os.getcwd()) + "\n\n"
         "The following command produced a non-zero return code:"
         + "\n\n"
         + CMD_PREFIX
         + program
         + "\n".join(complete_output)
     )
-    raise ShellError(message, program=program, output=complete_output)
+    if _log:
+        message += "\n\nThe complete output was saved to: " + _log
+    raise ShellError(message, program=program, output=complete_output, log=_log)
+
+
+def _run(command, cwd, shell) -> Tuple[int, List[str]]:
+    """Run a program to completion and read its output all at once."""
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        shell=shell,
+        env=_environment(command),
+        cwd=cwd,
+    )
+    with _processes_lock:
+        _processes.add(process)
+    try:
+        data, _ = process.communicate()
+    finally:
+        with _processes_lock:
+            _processes.discard(process)
+
+    # Match the universal newlines of the line-by-line reader
+    text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return process.returncode, [line.strip() for line in lines]
+
+
+def _run_streamed(command, cwd, shell) -> Tuple[int, List[str]]:
+    """Run a program and show each line of its output as it is printed."""
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        encoding="utf-8",
+        universal_newlines=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        shell=shell,
+        env=_environment(command),
+        cwd=cwd,
+    )
+    with _processes_lock:
+        _processes.add(process)
+
+    # Poll process.stdout to show stdout live
+    complete_output = []
+    try:
+        while True:
+            assert process.stdout
+            output = process.stdout.readline()
+            if output == "" and process.poll() is not None:
+                break
+
+            if output != "":
+                output = output.strip()
+            else:
+                continue
+
+            complete_output.append(output)
+            common.show(output, color="shell_output")
+    finally:
+        with _processes_lock:
+            _processes.discard(process)
+
+    return process.returncode, complete_output
+
+
+def _run_logged(
+    command, cwd, shell, *, stream: bool, path: str, program: str
+) -> Tuple[int, List[str]]:
+    """Run a program and save its output to a file, keeping only the end."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tail: collections.deque = collections.deque(maxlen=TAIL_LINES)
+    debug = not stream and _logger.isEnabledFor(logging.DEBUG)
+
+    with open(path, "a", encoding="utf-8") as logfile:
+        logfile.write(CMD_PREFIX + program + "\n")
+        logfile.flush()
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            command,
+            encoding="utf-8",
+            errors="replace",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            shell=shell,
+            env=_environment(command),
+            cwd=cwd,
+        )
+        with _processes_lock:
+            _processes.add(process)
+        try:
+            assert process.stdout
+            for line in process.stdout:
+                logfile.write(line)
+                output = line.strip()
+                tail.append(output)
+                if stream:
+                    common.show(output, color="shell_output")
+                elif debug:
+                    log.debug(OUT_PREFIX + output)
+            process.wait()
+        finally:
+            with _processes_lock:
+                _processes.discard(process)
+
+    return process.returncode, list(tail)
+
+
+def iterate(name, *args, _show=True, _separator="\0"):
+    """Call a program and yield its output one record at a time.
+
+    :param name: name of program to call
+    :param args: list of command-line arguments
+    :param _show: display the call arguments
+    :param _separator: character terminating each output record
+
+    Closing the generator before the output is exhausted terminates the
+    program, so callers can stop reading once they have what they need.
+    """
+    cwd = getattr(_local, "cwd", None)
+    if cwd and _interrupted.is_set():
+        raise KeyboardInterrupt
+
+    program = show(name, *args, stdout=_show)
+    separator = _separator.encode()
+
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [name, *args],
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            env=_environment([name, *args]),
+            cwd=cwd,
+        )
+        with _processes_lock:
+            _processes.add(process)
+
+        finished = False
+        try:
+            assert process.stdout
+            remainder = b""
+            while chunk := process.stdout.read1(  # type: ignore[attr-defined]
+                io.DEFAULT_BUFFER_SIZE
+            ):
+                *records, remainder = (remainder + chunk).split(separator)
+                for record in records:
+                    yield record.decode("utf-8", "replace")
+            if remainder:
+                yield remainder.decode("utf-8", "replace")
+            finished = True
+        finally:
+            if not finished:
+                log.debug("Stopped reading output from '%s'", name)
+                process.terminate()
+            process.stdout.close()  # type: ignore[union-attr]
+            process.wait()
+            with _processes_lock:
+                _processes.discard(process)
+
+        if process.returncode != 0:
+            stderr.seek(0)
+            output = stderr.read().decode("utf-8", "replace").splitlines()
+            message = (
+                "An external program call failed." + "\n\n"
+                "In working directory: " + (cwd or os.getcwd()) + "\n\n"
+                "The following command produced a non-zero return code:"
+                + "\n\n"
+                + CMD_PREFIX
+                + program
+                + "\n".join(output)
+            )
+            raise ShellError(message, program=program, output=output)
+
+
+class Coprocess:
+    """Long-running program that answers one line of input at a time."""
+
+    def __init__(self, name, *args):
+        show(name, *args, stdout=False)
+        self.args = [name, *args]
+        self._lock = threading.Lock()
+        self._process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [name, *args],
+            encoding="utf-8",
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=_environment(self.args),
+            cwd=getattr(_local, "cwd", None),
+        )
+        with _processes_lock:
+            _processes.add(self._process)
+
+    def query(self, line: str) -> str:
+        """Send a line of input and read back a line of output."""
+        with self._lock:
+            assert self._process.stdin and self._process.stdout
+            log.debug(CMD_PREFIX + line)
+            try:
+                self._process.stdin.write(line + "\n")
+                self._process.stdin.flush()
+                output = self._process.stdout.readline()
+            except OSError:
+                output = ""
+            if not output:
+                program = " ".join(self.args)
+                message = "The program '{}' stopped unexpectedly.".format(program)
+                raise ShellError(message, program=program, output=[])
+            output = output.rstrip("\n")
+            log.debug(OUT_PREFIX + output)
+            return output
+
+    def close(self):
+        """Ask the program to exit once its input ends."""
+        with self._lock:
+            with suppress(OSError):
+                self._process.stdin.close()  # type: ignore[union-attr]
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+            self._process.stdout.close()  # type: ignore[union-attr]
+        with _processes_lock:
+            _processes.discard(self._process)
+
+
+def detach(name, *args):
+    """Start a program in the background that keeps running after exit."""
+    show(name, *args, stdout=False)
+    options: dict = {}
+    if os.name == "nt":
+        options["creationflags"] = (
+            subprocess.DETACHED_PROCESS  # type: ignore[attr-defined]
+            | subprocess.CREATE_NEW_PROCESS_GROUP  # type: ignore[attr-defined]
+        )
+    else:
+        options["start_new_session"] = True
+    subprocess.Popen(  # pylint: disable=consider-using-with
+        [name, *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env=_environment([name, *args]),
+        cwd=getattr(_local, "cwd", None),
+        **options,
+    )
+
+
+def _environment(command=None) -> Dict[str, str]:
+    """Get the environment for a called program, including passed Git config.
+
+    The config is only passed to Git itself, so that scripts and any other
+    programs run by gitman are not changed by it.
+    """
+    env = _base_environment()
+    if _config and isinstance(command, list) and command[0] == "git":
+        env = dict(env)
+        count = int(env.get("GIT_CONFIG_COUNT") or 0)
+        for index, (key, value) in enumerate(_config.items(), start=count):
+            env[f"GIT_CONFIG_KEY_{index}"] = key
+            env[f"GIT_CONFIG_VALUE_{index}"] = value
+        env["GIT_CONFIG_COUNT"] = str(count + len(_config))
+    return env
+
+
+@functools.lru_cache()
+def _base_environment() -> Dict[str, str]:
+    """Copy and sanitize this process's environment once for all calls."""
+    # PyInstaller saves the original value to *_ORIG, then modifies the search
+    # path so that the bundled libraries are found first by the bundled code.
+    # But if your code executes a system program, you often do not want that
+    # this system program loads your bundled libraries (that are maybe not
+    # compatible with your system program) - it rather should load the correct
+    # libraries from the system locations like it usually does.
+    # Thus you need to restore the original path before creating the subprocess
+    # with the system program
+    # https://github.com/pyinstaller/pyinstaller/blob/483c819d6a256b58db6740696a901bd41c313f0c/doc/runtime-information.rst#ld_library_path--libpath-considerations
+    env = dict(os.environ)  # make a copy of the environment
+    lp_key = "LD_LIBRARY_PATH"  # for Linux and *BSD.
+    lp_orig = env.get(lp_key + "_ORIG")  # pyinstaller >= 20160820 has this
+    if lp_orig is not None:
+        env[lp_key] = lp_orig  # restore the original, unmodified value
+    else:
+        env.pop(lp_key, None)  # last resort: remove the env var
+    return env
 
 
 def mkdir(path):
     if not os.path.exists(path):
         if os.name == "nt":
-            call("mkdir " + path, _shell=True)
+            show("mkdir", path)
         else:
-            call("mkdir", "-p", path)
+            show("mkdir", "-p", path)
+        with _native("mkdir", path):
+            os.makedirs(path, exist_ok=True)
 
 
 def cd(path, _show=True):
@@ -109,11 +399,15 @@ def cd(path, _show=True):
         show("cd", "/D", path, stdout=_show)
     else:
         show("cd", path, stdout=_show)
-    os.chdir(path)
+    cwd = getattr(_local, "cwd", None)
+    if cwd:
+        _local.cwd = os.path.normpath(os.path.join(cwd, path))
+    else:
+        os.chdir(path)
 
 
 def pwd(_show=True):
-    cwd = os.getcwd()
+    cwd = getattr(_local, "cwd", None) or os.getcwd()
     if os.name == "nt":
         cwd = cwd.replace(os.sep, "/")
     show("cwd", cwd, stdout=_show)
@@ -130,11 +424,164 @@ def ln(source, target):
 def rm(path):
     if os.name == "nt":
         if os.path.isfile(path):
-            call("del /Q /F " + path, _shell=True)
+            show("del", "/Q", "/F", path)
         elif os.path.isdir(path):
-            call("rmdir /Q /S " + path, _shell=True)
+            show("rmdir", "/Q", "/S", path)
     else:
-        call("rm", "-rf", path)
+        show("rm", "-rf", path)
+    with _native("rm", path):
+        _remove(path)
+
+
+def trash(path, directory):
+    """Move a path into a directory of items to delete later.
+
+    Moving is atomic and fast within a filesystem. Otherwise, the path is
+    deleted right away.
+    """
+    if not os.path.lexists(path):
+        return
+    container = _container(os.path.basename(path), directory)
+    if container is None:
+        rm(path)
+        return
+    target = os.path.join(container, os.path.basename(path))
+    show("mv", path, target)
+    try:
+        os.rename(path, target)
+    except OSError as exception:
+        log.debug("Unable to move %s aside: %s", path, exception)
+        with suppress(OSError):
+            os.rmdir(container)
+        rm(path)
+
+
+def _container(name, directory) -> Optional[str]:
+    """Create a new directory to move an item into for deleting later."""
+    for _ in range(TRASH_ATTEMPTS):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return tempfile.mkdtemp(prefix=name + ".", dir=directory)
+        except FileNotFoundError:
+            # A purge started earlier may delete the directory at any time
+            log.debug("Directory was deleted while trashing %s", name)
+    return None
+
+
+def purge(directory):
+    """Delete a directory of items to delete later in a detached program.
+
+    Deletions interrupted by an exit are finished by purging again.
+    """
+    if not os.path.isdir(directory):
+        return
+    if os.name == "nt":
+        detach("cmd", "/c", "rmdir", "/Q", "/S", directory)
+    else:
+        detach("rm", "-rf", directory)
+
+
+@contextmanager
+def _native(name, path):
+    """Report a failed filesystem operation like a failed program call."""
+    try:
+        yield
+    except OSError as exception:
+        program = " ".join([name, path])
+        output = [str(exception)]
+        message = "The operation '{}' failed: {}".format(program, exception)
+        raise ShellError(message, program=program, output=output) from exception
+
+
+def _remove(path):
+    """Delete a file, link, or directory tree, if it exists."""
+    try:
+        if not os.path.isdir(path) or os.path.islink(path):
+            _unlink(path)
+            return
+    except FileNotFoundError:
+        return
+
+    # Subdirectories are deleted concurrently since removal waits on disk I/O
+    directories = _clear(path)
+    if directories:
+        workers = min(RM_WORKERS, len(directories))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(_rmtree, d) for d in directories]:
+                future.result()
+    os.rmdir(path)
+
+
+def _rmtree(path):
+    for directory in _clear(path):
+        _rmtree(directory)
+    os.rmdir(path)
+
+
+def _clear(path) -> List[str]:
+    """Delete the files in a directory and list its subdirectories."""
+    directories = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            else:
+                _unlink(entry.path)
+    return directories
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except PermissionError:
+        # Git marks its objects read-only, which prevents deletion on Windows
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+@contextmanager
+def configured(values):
+    """Pass Git configuration to every Git command called within this context.
+
+    Values are passed through the environment of the called programs only,
+    so they are neither displayed with each command nor seen by this process.
+    """
+    previous = dict(_config)
+    _config.update(values)
+    try:
+        yield
+    finally:
+        _config.clear()
+        _config.update(previous)
+
+
+@contextmanager
+def isolated(path):
+    """Track a working directory for the current thread only.
+
+    Programs called from within this context run in the tracked directory
+    and `cd` no longer changes the directory of the whole process.
+    """
+    _local.cwd = os.path.abspath(path)
+    try:
+        yield
+    finally:
+        del _local.cwd
+
+
+def interrupt():
+    """Terminate all running programs and refuse to start new isolated ones."""
+    _interrupted.set()
+    with _processes_lock:
+        processes = list(_processes)
+    for process in processes:
+        log.debug("Terminating process %s", process.pid)
+        process.terminate()
+
+
+def resume():
+    """Allow isolated programs to be called again after an interrupt."""
+    _interrupted.clear()
 
 
 def show(name, *args, stdout=True):
@@ -79,6 +79,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -97,6 +99,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -115,6 +119,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -133,6 +139,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -151,6 +159,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -171,6 +181,8 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
             skip_default_group=False,
         )
 
@@ -189,6 +201,28 @@ class TestInstall:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
+            skip_default_group=False,
+        )
+
+    @patch("gitman.commands.install")
+    def test_install_with_jobs(self, mock_install):
+        """Verify dependencies can be installed in parallel."""
+        cli.main(["install", "--jobs", "4", "--keep-going"])
+
+        mock_install.assert_called_once_with(
+            root=None,
+            depth=5,
+            force=False,
+            force_interactive=False,
+            fetch=False,
+            clean=False,
+            skip_changes=False,
+            skip_scripts=False,
+            skip_patches=False,
+            jobs=4,
+            keep_going=True,
             skip_default_group=False,
         )
 
@@ -220,6 +254,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -238,6 +274,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -256,6 +294,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -274,6 +314,8 @@ class TestUpdate:
             skip_changes=True,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -292,6 +334,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -310,6 +354,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -330,6 +376,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
     @patch("gitman.commands.update")
@@ -348,6 +396,8 @@ class TestUpdate:
             skip_changes=False,
             skip_scripts=False,
             skip_patches=False,
+            jobs=1,
+            keep_going=False,
         )
 
 
@@ -406,7 +456,7 @@ class TestUninstall:
         cli.main(["uninstall"])
 
         mock_uninstall.assert_called_once_with(
-            root=None, force=False, keep_location=False
+            root=None, force=False, keep_location=False, background=False
         )
 
     @patch("gitman.commands.delete")
@@ -415,7 +465,10 @@ class TestUninstall:
         cli.main(["uninstall", "--root", "mock/path/to/root"])
 
         mock_uninstall.assert_called_once_with(
-            root="mock/path/to/root", force=False, keep_location=False
+            root="mock/path/to/root",
+            force=False,
+            keep_location=False,
+            background=False,
         )
 
     @patch("gitman.commands.delete")
@@ -424,7 +477,7 @@ class TestUninstall:
         cli.main(["uninstall", "--force"])
 
         mock_uninstall.assert_called_once_with(
-            root=None, force=True, keep_location=False
+            root=None, force=True, keep_location=False, background=False
         )
 
     @patch("gitman.commands.delete")
@@ -433,7 +486,16 @@ class TestUninstall:
         cli.main(["uninstall", "--keep-location"])
 
         mock_uninstall.assert_called_once_with(
-            root=None, force=False, keep_location=True
+            root=None, force=False, keep_location=True, background=False
+        )
+
+    @patch("gitman.commands.delete")
+    def test_uninstall_background(self, mock_uninstall):
+        """Verify the 'uninstall' command can delete in the background."""
+        cli.main(["uninstall", "--background"])
+
+        mock_uninstall.assert_called_once_with(
+            root=None, force=False, keep_location=False, background=True
         )
 
 
@@ -463,6 +525,11 @@ def describe_show():
         cli.main(["show", "--log"])
         show.assert_called_once_with("__log__", root=None)
 
+    @patch("gitman.commands.show")
+    def with_performance(show):
+        cli.main(["show", "--performance"])
+        show.assert_called_once_with("__performance__", root=None)
+
 
 def describe_edit():
     @patch("gitman.commands.edit")
@@ -476,6 +543,31 @@ def describe_edit():
         edit.assert_called_once_with(root="mock/root")
 
 
+def describe_cache():
+    @patch("gitman.commands.gc")
+    def with_gc(gc):
+        cli.main(["cache", "gc"])
+        gc.assert_called_once_with(max_size=None, dissociate=False)
+
+    @patch("gitman.commands.gc")
+    def with_gc_budget(gc):
+        cli.main(["cache", "gc", "--max-size", "2G", "--dissociate"])
+        gc.assert_called_once_with(max_size=2 * 1024**3, dissociate=True)
+
+    @patch("gitman.commands.maintain")
+    def with_maintain(maintain):
+        cli.main(["cache", "maintain", "--time-limit", "60"])
+        maintain.assert_called_once_with(time_limit=60)
+
+    @pytest.mark.parametrize(
+        "args",
+        [["gc", "--time-limit", "60"], ["maintain", "--max-size", "2G"], []],
+    )
+    def with_invalid_arguments(args):
+        with pytest.raises(SystemExit):
+            cli.main(["cache", *args])
+
+
 def describe_logging():
 
     argument_verbosity = [
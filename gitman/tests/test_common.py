@@ -35,6 +35,23 @@ class TestShowConsole:
         assert [call.write("|\n"), call.write("\n")] == self.file.mock_calls
 
 
+class TestShowBuffered:
+    def setup_method(self, _):
+        _Config.indent_level = 0
+        _Config.verbosity = 0
+        self.file = Mock()
+
+    def test_show_is_deferred(self):
+        with common.buffered() as output:
+            common.show("Hello, world!", file=self.file, color=None)
+
+        assert [] == self.file.mock_calls
+
+        common.flush(output)
+
+        assert [call.write("Hello, world!"), call.write("\n")] == self.file.mock_calls
+
+
 class TestShowLog:
     def setup_method(self, _):
         _Config.indent_level = 0
@@ -1,27 +1,69 @@
+# pylint: disable=singleton-comparison,expression-not-assigned,protected-access,redefined-outer-name,unused-argument
+
 import os
-from unittest.mock import Mock, patch
+import pathlib
+import time
+from contextlib import contextmanager
+from unittest.mock import Mock, mock_open, patch
+
+import pytest
+from expecter import expect
 
-from gitman import git, settings
-from gitman.exceptions import ShellError
+from gitman import git, mirrors, settings, shell
+from gitman.exceptions import InvalidRepository, ShellError
 
 from .utils import check_calls
 
+CLEAN = [
+    "# branch.oid abc123",
+    "# branch.head main",
+    "# branch.upstream origin/main",
+    "# branch.ab +0 -0",
+]
+
+
+SAVE = mirrors.Mirror.save
+
+
+def mirror(filter=None):
+    """Get the cache location of the mock repository from the current directory."""
+    return os.path.join("cache", mirrors.key("mock.git", filter) + ".mirror")
+
+
+def records(*lines):
+    yield from lines
+
+
+@pytest.fixture(autouse=True)
+def forget_refreshed_mirrors():
+    git._refreshed_mirrors.clear()
+    yield
+    git.version.cache_clear()
+
 
 @patch("gitman.git.call")
+@patch("gitman.gitdir.find", Mock(return_value=None))
+@patch("gitman.git._get_config", Mock(return_value=None))
+@patch("gitman.mirrors.Mirror.save", Mock())
 class TestGit:
     """Tests for calls to Git."""
 
+    @pytest.fixture(autouse=True)
+    def in_tmpdir(self, tmpdir, monkeypatch):
+        monkeypatch.chdir(tmpdir)
+
     @patch("os.path.isdir", Mock(return_value=False))
+    @patch("tempfile.mkdtemp", Mock(return_value="cache/mock.tmp"))
+    @patch("os.rename", Mock())
     def test_clone(self, mock_call):
         """Verify the commands to set up a new reference repository."""
         git.clone("git", "mock.git", "mock/path", cache="cache")
         check_calls(
             mock_call,
             [
-                "git clone --mirror mock.git "
-                + os.path.normpath("cache/mock.reference"),
+                "git clone --mirror mock.git cache/mock.tmp",
                 "git clone --reference-if-able "
-                + os.path.normpath("cache/mock.reference")
+                + mirror()
                 + " mock.git "
                 + os.path.normpath("mock/path"),
             ],
@@ -32,13 +74,39 @@ class TestGit:
         """Verify the commands to clone a repository."""
         settings.CACHE_DISABLE = True
         try:
-            git.clone("git", "mock.git", "mock/path", cache="cache")
+            with patch("gitman.mirrors.get") as mock_get:
+                git.clone("git", "mock.git", "mock/path", cache="cache")
             check_calls(
                 mock_call, ["git clone mock.git " + os.path.normpath("mock/path")]
             )
+            mock_get.assert_not_called()
         finally:
             settings.CACHE_DISABLE = False
 
+    @patch("os.path.isdir", Mock(return_value=True))
+    def test_clone_locks_mirror(self, mock_call):
+        """Verify the mirror stays locked until the checkout is registered."""
+        events = []
+
+        @contextmanager
+        def locked(mirror, **_):
+            events.append("lock " + mirror.path)
+            yield True
+            events.append("unlock " + mirror.path)
+
+        def call(*args, **_):
+            events.append(args[1])
+            return []
+
+        mock_call.side_effect = call
+        with patch("gitman.mirrors.locked", locked), patch.object(
+            mirrors.Mirror, "register", lambda *_: events.append("register")
+        ):
+            git.clone("git", "mock.git", "mock/path", cache="cache")
+
+        expect(events[0]) == "lock " + mirror()
+        expect(events[-3:]) == ["clone", "register", "unlock " + mirror()]
+
     @patch("os.path.isdir", Mock(return_value=True))
     def test_clone_from_reference(self, mock_call):
         """Verify the commands to clone a Git repository from a reference."""
@@ -46,13 +114,201 @@ class TestGit:
         check_calls(
             mock_call,
             [
+                f"git -C {mirror()} fetch --prune origin",
                 "git clone --reference-if-able "
-                + os.path.normpath("cache/mock.reference")
+                + mirror()
                 + " mock.git "
+                + os.path.normpath("mock/path"),
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch.object(settings, "CACHE_MIRROR_FETCH", True)
+    def test_clone_from_mirror(self, mock_call):
+        """Verify the commands to clone a Git repository locally from a mirror."""
+        git.clone("git", "mock.git", "mock/path", cache="cache")
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} fetch --prune origin",
+                f"git clone --shared {mirror()} " + os.path.normpath("mock/path"),
+                "git -C "
                 + os.path.normpath("mock/path")
+                + " remote set-url origin mock.git",
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch.object(settings, "CACHE_MIRROR_FETCH", True)
+    def test_clone_partial(self, mock_call):
+        """Verify a partial clone borrows from a separate partial mirror."""
+        git.clone("git", "mock.git", "mock/path", cache="cache", filter="blob:none")
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror('blob:none')} fetch --prune origin",
+                "git clone --reference-if-able "
+                + mirror("blob:none")
+                + " mock.git "
+                + os.path.normpath("mock/path")
+                + " --filter=blob:none",
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=False))
+    @patch.object(settings, "CLONE_STRATEGY", "auto")
+    @patch.object(settings, "CACHE_DISABLE", True)
+    def test_clone_strategy_tag(self, mock_call):
+        """Verify a tag is cloned shallow without other branches."""
+        mock_call.side_effect = [["abc123\trefs/tags/v1"], [], []]
+        git.clone("git", "mock.git", "mock/path", cache="cache", rev="v1")
+        check_calls(
+            mock_call,
+            [
+                "git ls-remote mock.git refs/heads/v1 refs/tags/v1",
+                "git clone mock.git "
+                + os.path.normpath("mock/path")
+                + " --single-branch --branch v1 --depth=1",
+                "git -C mock/path config gitman.strategy tag",
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch.object(settings, "CLONE_STRATEGY", "auto")
+    def test_clone_strategy_branch(self, mock_call):
+        """Verify a branch is cloned from the mirror without other branches."""
+        mock_call.side_effect = [[], ["abc123\trefs/heads/dev"], [], []]
+        git.clone("git", "mock.git", "mock/path", cache="cache", rev="dev")
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} fetch --prune origin",
+                f"git ls-remote {mirror()} refs/heads/dev refs/tags/dev",
+                "git clone --reference-if-able "
+                + mirror()
+                + " mock.git "
+                + os.path.normpath("mock/path")
+                + " --single-branch --branch dev",
+                "git -C mock/path config gitman.strategy branch",
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    def test_clone_worktree(self, mock_call):
+        """Verify a worktree of the mirror is created after fetching it."""
+        git.clone("git", "mock.git", "mock/path", cache="cache", checkout="worktree")
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} fetch --prune origin",
+                f"git -C {mirror()} worktree prune",
+                f"git -C {mirror()} worktree add --detach "
+                + os.path.join(os.getcwd(), "mock", "path"),
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch("gitman.git.open", mock_open(), create=True)
+    def test_clone_sparse(self, mock_call):
+        """Verify a sparse checkout fetches from the mirror without blobs."""
+        git.clone(
+            "git",
+            "mock.git",
+            "mock/path",
+            cache="cache",
+            sparse_paths=["src"],
+            rev="main",
+        )
+        spec = git._sparse_spec(["src"])
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} fetch --prune origin",
+                "git -C mock/path init",
+                "git -C mock/path remote add origin mock.git",
+                "git -C mock/path config remote.origin.promisor true",
+                "git -C mock/path config remote.origin.partialclonefilter blob:none",
+                "git -C mock/path config index.sparse true",
+                "git -C mock/path sparse-checkout init --cone",
+                "git -C mock/path sparse-checkout set src",
+                f"git -C mock/path config gitman.sparseSpec {spec}",
+                f"git -C mock/path fetch --tags --force --prune {mirror()} "
+                + "+refs/heads/*:refs/remotes/origin/*",
+                "git -C mock/path checkout main",
+            ],
+        )
+
+    def test_apply_sparse_checkout(self, mock_call):
+        """Verify changed sparse-checkout paths are applied and recorded."""
+        git.apply_sparse_checkout(["src/*", "docs"])
+
+        spec = git._sparse_spec(["src", "docs"])
+        check_calls(
+            mock_call,
+            [
+                "git config index.sparse true",
+                "git sparse-checkout set src docs",
+                f"git config gitman.sparseSpec {spec}",
+            ],
+        )
+
+    def test_apply_sparse_checkout_unchanged(self, mock_call):
+        """Verify unchanged sparse-checkout paths are not reapplied."""
+        with patch(
+            "gitman.git._get_config", Mock(return_value=git._sparse_spec(["src"]))
+        ):
+            git.apply_sparse_checkout(["src"])
+
+        check_calls(mock_call, [])
+
+    def test_refresh_mirror_when_stale(self, mock_call):
+        """Verify a mirror older than the TTL is fetched once per run."""
+        reference = mirrors.Mirror("cache/mock.mirror", refreshed=time.time() - 7200)
+
+        with patch.object(mirrors.Mirror, "save"):
+            expect(git.refresh_mirror(reference)) == True
+            expect(git.refresh_mirror(reference)) == False
+
+        check_calls(mock_call, ["git -C cache/mock.mirror fetch --prune origin"])
+
+    def test_refresh_mirror_when_fresh(self, mock_call):
+        """Verify a recently fetched mirror containing the revision is reused."""
+        reference = mirrors.Mirror("cache/mock.mirror", refreshed=time.time())
+
+        expect(git.refresh_mirror(reference, "v1.0")) == False
+
+        check_calls(mock_call, ["git -C cache/mock.mirror cat-file -e v1.0^{commit}"])
+
+    def test_refresh_mirror_when_missing_revision(self, mock_call):
+        """Verify a recently fetched mirror is fetched for a missing revision."""
+        reference = mirrors.Mirror("cache/mock.mirror", refreshed=time.time())
+        mock_call.side_effect = [ShellError("missing"), ""]
+
+        with patch.object(mirrors.Mirror, "save"):
+            expect(git.refresh_mirror(reference, "abc123")) == True
+
+        check_calls(
+            mock_call,
+            [
+                "git -C cache/mock.mirror cat-file -e abc123^{commit}",
+                "git -C cache/mock.mirror fetch --prune origin",
             ],
         )
 
+    @patch("gitman.git._worktree_mirror", Mock(return_value="cache/mock.mirror"))
+    def test_fetch_worktree(self, mock_call):
+        """Verify a worktree is fetched by refreshing its mirror."""
+        git.fetch("git", "mock.git", "mock/path", rev="main", refresh=True)
+        check_calls(mock_call, ["git -C cache/mock.mirror fetch --prune origin"])
+
+    @patch("gitman.git._worktree_mirror", Mock(return_value="cache/mock.mirror"))
+    @patch("gitman.git._mirror_contains", Mock(return_value=True))
+    def test_fetch_worktree_from_recent_mirror(self, mock_call):
+        """Verify a worktree only refreshes a stale mirror unless requested."""
+        with patch.object(mirrors.Mirror, "stale", Mock(return_value=False)):
+            git.fetch("git", "mock.git", "mock/path", rev="main")
+        check_calls(mock_call, [])
+
     def test_fetch(self, mock_call):
         """Verify the commands to fetch from a Git repository."""
         git.fetch("git", "mock.git", "mock/path")
@@ -64,6 +320,40 @@ class TestGit:
             ],
         )
 
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch.object(settings, "CACHE_MIRROR_FETCH", True)
+    def test_fetch_from_mirror(self, mock_call):
+        """Verify the commands to fetch from a refreshed mirror."""
+        git.fetch("git", "mock.git", "mock/path", "mock-rev", cache="cache")
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} fetch --prune origin",
+                f"git -C {mirror()} cat-file -e mock-rev^{{commit}}",
+                "git remote set-url origin mock.git",
+                f"git fetch --tags --force --prune {mirror()} "
+                + "+refs/heads/*:refs/remotes/origin/*",
+            ],
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch.object(settings, "CACHE_MIRROR_FETCH", True)
+    def test_fetch_from_mirror_missing_revision(self, mock_call):
+        """Verify the remote is used when the mirror lacks a revision."""
+        git._refreshed_mirrors.add(mirror())
+        mock_call.side_effect = [ShellError("missing"), "", ""]
+
+        git.fetch("git", "mock.git", "mock/path", "mock-rev", cache="cache")
+
+        check_calls(
+            mock_call,
+            [
+                f"git -C {mirror()} cat-file -e mock-rev^{{commit}}",
+                "git remote set-url origin mock.git",
+                "git fetch --tags --force --prune origin mock-rev",
+            ],
+        )
+
     def test_fetch_rev(self, mock_call):
         """Verify the commands to fetch from a Git repository w/ rev."""
         git.fetch("git", "mock.git", "mock/path", "mock-rev")
@@ -97,6 +387,133 @@ class TestGit:
             ],
         )
 
+    @patch.object(settings, "FETCH_TARGETED", True)
+    @patch("gitman.git.resolve", Mock(side_effect=[None, "abc123"]))
+    def test_fetch_targeted_tag(self, mock_call):
+        """Verify only the tag is fetched for a tag revision."""
+        git.fetch("git", "mock.git", "mock/path", "v1.0")
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git fetch --no-tags --force origin +refs/tags/v1.0:refs/tags/v1.0",
+            ],
+        )
+
+    @patch.object(settings, "FETCH_TARGETED", True)
+    @patch("gitman.git.resolve", Mock(return_value=None))
+    def test_fetch_targeted_branch(self, mock_call):
+        """Verify only the branch is fetched for a new branch revision."""
+        mock_call.side_effect = [
+            [],
+            ["abc123\trefs/heads/feature"],
+            [],
+        ]
+        git.fetch("git", "mock.git", "mock/path", "feature@{2015-02-12 18:30:00}")
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git ls-remote origin refs/heads/feature refs/tags/feature",
+                "git fetch --no-tags --force origin "
+                + "+refs/heads/feature:refs/remotes/origin/feature",
+            ],
+        )
+
+    @patch.object(settings, "FETCH_TARGETED", True)
+    @patch("gitman.git.resolve", Mock(return_value=None))
+    def test_fetch_targeted_sha(self, mock_call):
+        """Verify a missing commit is fetched directly by its SHA."""
+        git.fetch("git", "mock.git", "mock/path", "abcdef1234" * 4)
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git fetch --no-tags --force origin " + "abcdef1234" * 4,
+            ],
+        )
+
+    @patch.object(settings, "FETCH_TARGETED", True)
+    @patch("gitman.git.resolve", Mock(return_value=None))
+    def test_fetch_targeted_sha_refused(self, mock_call):
+        """Verify a full fetch is used when the server refuses a SHA."""
+        mock_call.side_effect = [[], ShellError("refused"), []]
+        git.fetch("git", "mock.git", "mock/path", "abcdef1234" * 4)
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git fetch --no-tags --force origin " + "abcdef1234" * 4,
+                "git fetch --tags --force --prune origin",
+            ],
+        )
+
+    @patch.object(settings, "FETCH_TARGETED", True)
+    @patch("gitman.git.resolve", Mock(return_value="abc123"))
+    def test_fetch_targeted_sha_present(self, mock_call):
+        """Verify nothing is fetched when the commit is already present."""
+        git.fetch("git", "mock.git", "mock/path", "abcdef1")
+        check_calls(mock_call, ["git remote set-url origin mock.git"])
+
+    @patch("gitman.git._is_shallow", Mock(return_value=True))
+    @patch("gitman.git.resolve", Mock(return_value=None))
+    def test_fetch_shallow_tag(self, mock_call):
+        """Verify a shallow clone of a tag stays shallow for another tag."""
+        mock_call.side_effect = [[], ["abc123\trefs/tags/v2"], []]
+        with patch("gitman.git._get_config", Mock(return_value="tag")):
+            git.fetch("git", "mock.git", "mock/path", "v2")
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git ls-remote origin refs/heads/v2 refs/tags/v2",
+                "git fetch --no-tags --force --depth=1 origin "
+                + "+refs/tags/v2:refs/tags/v2",
+            ],
+        )
+
+    @patch("gitman.git._is_shallow", Mock(return_value=False))
+    @patch("gitman.git.resolve", Mock(return_value=None))
+    def test_fetch_narrow_branch(self, mock_call):
+        """Verify a narrow clone tracks another branch once it is fetched."""
+        mock_call.side_effect = [
+            [],
+            ["abc123\trefs/heads/dev"],
+            [],
+            ["+refs/heads/main:refs/remotes/origin/main"],
+            [],
+        ]
+        with patch("gitman.git._get_config", Mock(return_value="branch")):
+            git.fetch("git", "mock.git", "mock/path", "dev")
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git ls-remote origin refs/heads/dev refs/tags/dev",
+                "git fetch --no-tags --force origin "
+                + "+refs/heads/dev:refs/remotes/origin/dev",
+                "git config --get-all remote.origin.fetch",
+                "git config --add remote.origin.fetch "
+                + "+refs/heads/dev:refs/remotes/origin/dev",
+            ],
+        )
+
+    @patch("gitman.git._is_shallow", Mock(return_value=True))
+    def test_fetch_shallow_tag_widened(self, mock_call):
+        """Verify a shallow clone is deepened when a date needs history."""
+        with patch("gitman.git._get_config", Mock(return_value="tag")):
+            git.fetch("git", "mock.git", "mock/path", "main@{2015-02-12 18:30:00}")
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git config remote.origin.fetch +refs/heads/*:refs/remotes/origin/*",
+                "git config --unset remote.origin.tagOpt",
+                "git config gitman.strategy full",
+                "git fetch --tags --force --prune origin --unshallow",
+            ],
+        )
+
     @patch("os.getcwd", Mock(return_value="mock/outside_repo/nested_repo"))
     def test_valid(self, _):
         """Verify the commands to check for a working tree and is toplevel of repo."""
@@ -130,40 +547,253 @@ class TestGit:
         git.rebuild("git-svn", "master@{2015-02-12 18:30:00}")
         check_calls(mock_call, [])
 
-    def test_changes(self, mock_call):
-        """Verify the commands to check for uncommitted changes."""
-        git.changes("git", include_untracked=True)
-        check_calls(
-            mock_call,
-            [
-                # based on: http://stackoverflow.com/questions/3878624
-                "git update-index -q --refresh",
-                "git diff-index --quiet HEAD",
-                "git ls-files --others --exclude-standard",
-                "git status",  # used for displaying the overall status
-            ],
+    def test_status(self, mock_call):
+        """Verify the working tree snapshot is parsed from a single call."""
+        with patch("gitman.git.iterate", Mock(return_value=records(*CLEAN))) as mock:
+            snapshot = git.status("git")
+        assert snapshot is not None
+
+        mock.assert_called_once_with(
+            "git",
+            "status",
+            "--porcelain=v2",
+            "-z",
+            "--branch",
+            "--untracked-files=no",
+            _show=False,
         )
+        check_calls(mock_call, [])
+        expect(snapshot.head) == "abc123"
+        expect(snapshot.branch) == "main"
+        expect(snapshot.upstream) == "origin/main"
+        expect(snapshot.dirty(include_untracked=True)) == False
+
+    def test_status_detached(self, _):
+        """Verify a detached HEAD has no branch."""
+        lines = ["# branch.oid abc123", "# branch.head (detached)"]
+        with patch("gitman.git.iterate", Mock(return_value=records(*lines))):
+            snapshot = git.status("git")
+        assert snapshot is not None
+
+        expect(snapshot.branch) == None
+        expect(snapshot.upstream) == None
+
+    def test_status_initial(self, _):
+        """Verify a working tree without commits is considered dirty."""
+        lines = ["# branch.oid (initial)", "# branch.head main"]
+        with patch("gitman.git.iterate", Mock(return_value=records(*lines))):
+            snapshot = git.status("git")
+        assert snapshot is not None
+
+        expect(snapshot.head) == None
+        expect(snapshot.dirty()) == True
+
+    def test_status_changes(self, _):
+        """Verify tracked changes are summarized."""
+        lines = CLEAN + [
+            "1 .M N... 100644 100644 100644 abc abc file with spaces.txt",
+            "2 R. N... 100644 100644 100644 abc abc R100 new.txt",
+            "old.txt",
+        ]
+        with patch("gitman.git.iterate", Mock(return_value=records(*lines))):
+            snapshot = git.status("git")
+        assert snapshot is not None
+
+        expect(snapshot.lines) == [" M file with spaces.txt", "R  old.txt -> new.txt"]
+
+    def test_status_stops_reading_untracked(self, _):
+        """Verify untracked entries are no longer read once dirty."""
+        generator = records(*CLEAN, "? file_1", "? file_2", "? file_3")
+        with patch("gitman.git.iterate", Mock(return_value=generator)):
+            snapshot = git.status("git", include_untracked=True)
+        assert snapshot is not None
+
+        expect(snapshot.untracked) == ["?? file_1"]
+        expect(snapshot.complete) == False
+        expect(snapshot.lines) == ["?? file_1", "..."]
+        expect(generator.gi_frame) == None  # closed
+
+    def test_status_gitsvn(self, mock_call):
+        """Verify the status is ignored with git-svn type"""
+        expect(git.status("git-svn")) == None
+        check_calls(mock_call, [])
+
+    def test_changes(self, mock_call):
+        """Verify the snapshot is reused to display uncommitted changes."""
+        lines = CLEAN + ["1 .M N... 100644 100644 100644 abc abc file_1"]
+        with patch("gitman.git.iterate", Mock(return_value=records(*lines))):
+            with patch("gitman.common.show") as mock_show:
+                assert True is git.changes("git", include_untracked=True)
+
+        mock_show.assert_called_once_with(" M file_1", color="git_changes")
+        check_calls(mock_call, [])
 
     def test_changes_false(self, _):
         """Verify the absence of changes can be detected."""
-        with patch("gitman.git.call", Mock(return_value=[""])):
+        with patch("gitman.git.iterate", Mock(return_value=records(*CLEAN))):
             assert False is git.changes("git")
 
     def test_changes_false_with_untracked(self, _):
         """Verify untracked files can be detected."""
-        with patch("gitman.git.call", Mock(return_value=["file_1"])):
-            assert False is git.changes("git")
+        snapshot = git.Status(head="abc123", untracked=["?? file_1"])
+        assert False is git.changes("git", snapshot=snapshot)
 
     def test_changes_true_when_untracked_included(self, _):
         """Verify untracked files can be detected."""
-        with patch("gitman.git.call", Mock(return_value=["file_1"])):
+        lines = CLEAN + ["? file_1"]
+        with patch("gitman.git.iterate", Mock(return_value=records(*lines))):
             assert True is git.changes("git", include_untracked=True)
 
     def test_changes_true_when_uncommitted(self, _):
         """Verify uncommitted changes can be detected."""
-        with patch("gitman.git.call", Mock(side_effect=ShellError)):
+        with patch("gitman.git.iterate", Mock(side_effect=ShellError)):
             assert True is git.changes("git", display_status=False)
 
+    def test_is_fetch_required(self, mock_call):
+        """Verify the snapshot is reused to check the current revision."""
+        snapshot = git.Status(head="abc123", branch="main")
+
+        assert False is git.is_fetch_required("git", "main", snapshot=snapshot)
+        assert False is git.is_fetch_required("git", "abc123", snapshot=snapshot)
+        check_calls(mock_call, [])
+
+    def test_update_gitsvn(self, mock_call):
+        """Verify a git-svn clone is created for a new working tree."""
+        mock_call.side_effect = [[], [], [], ["a" * 40], [], []]
+        settings.CACHE_DISABLE = True
+        try:
+            git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+        finally:
+            settings.CACHE_DISABLE = False
+        check_calls(
+            mock_call,
+            [
+                "git svn init svn://mock/repo .",
+                "git svn find-rev r42 refs/remotes/git-svn",
+                "git svn fetch -r 42",
+                "git svn find-rev -B r42 refs/remotes/git-svn",
+                "git clean --force -d -x",
+                "git checkout --force --detach " + "a" * 40,
+            ],
+        )
+
+    def test_update_gitsvn_from_mirror(self, mock_call, tmpdir):
+        """Verify SVN revisions are imported once into a shared mirror."""
+        temporary = tmpdir.join("cache", "svn.tmp").ensure(dir=True)
+        shared = mirrors.Mirror(str(tmpdir.join("cache", "svn.mirror")))
+        checkout = str(tmpdir.join("mock").ensure(dir=True))
+        mock_call.side_effect = lambda *args, **kwargs: (
+            ["a" * 40] if args[-3:-1] == ("-B", "r42") else []
+        )
+
+        # Installs in parallel track each checkout without changing directory
+        with shell.isolated(checkout), patch(
+            "gitman.mirrors.get", Mock(return_value=shared)
+        ):
+            with patch("tempfile.mkdtemp", Mock(return_value=str(temporary))):
+                git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+
+        check_calls(
+            mock_call,
+            [
+                "git svn init svn://mock/repo .",
+                "git svn find-rev r42 refs/remotes/git-svn",
+                f"git init --bare {temporary}",
+                f"git -C {temporary} svn init svn://mock/repo",
+                "git -C " + shared.path + " svn fetch",
+                "git fetch --force "
+                + shared.path
+                + " +refs/remotes/git-svn:refs/remotes/git-svn",
+                "git svn find-rev -B r42 refs/remotes/git-svn",
+                "git clean --force -d -x",
+                "git checkout --force --detach " + "a" * 40,
+            ],
+        )
+        alternates = tmpdir.join("mock", ".git", "objects", "info", "alternates")
+        expect(alternates.read()) == os.path.join(shared.path, "objects") + "\n"
+        expect(shared.references()) == [str(tmpdir.join("mock"))]
+
+    def test_update_gitsvn_from_current_mirror(self, mock_call):
+        """Verify a mirror already containing the SVN revision is not fetched."""
+        mock_call.return_value = ["a" * 40]
+        shared = mirrors.Mirror(os.path.join("cache", "svn.mirror"))
+        os.makedirs(shared.path)
+
+        with patch("gitman.mirrors.get", Mock(return_value=shared)):
+            git._prepare_svn_mirror(shared, "svn://mock/repo", "42")
+
+        check_calls(
+            mock_call,
+            ["git -C " + shared.path + " svn find-rev r42 refs/remotes/git-svn"],
+        )
+
+    def test_update_gitsvn_fetched(self, mock_call):
+        """Verify a revision that was already imported is checked out locally."""
+        mock_call.return_value = ["a" * 40]
+        with patch("gitman.git._get_config", Mock(return_value="svn://mock/repo")):
+            with patch("gitman.git.resolve", Mock(return_value="b" * 40)):
+                git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+        check_calls(
+            mock_call,
+            [
+                "git svn find-rev r42 refs/remotes/git-svn",
+                "git clean --force -d -x",
+                "git checkout --force --detach " + "a" * 40,
+            ],
+        )
+
+    @patch.object(settings, "CACHE_DISABLE", True)
+    def test_update_gitsvn_older(self, mock_call, tmpdir):
+        """Verify an SVN revision older than the imported ones is imported again."""
+        tmpdir.join(".git", "config").write("", ensure=True)
+        mock_call.side_effect = [[], ["50"], [], [], ["a" * 40], [], []]
+
+        with patch("gitman.git._get_config", Mock(return_value="svn://mock/repo")):
+            git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+
+        expect(tmpdir.join(".git").exists()) == False
+        check_calls(
+            mock_call,
+            [
+                "git svn find-rev r42 refs/remotes/git-svn",
+                "git svn find-rev refs/remotes/git-svn",
+                "git svn init svn://mock/repo .",
+                "git svn fetch -r 42",
+                "git svn find-rev -B r42 refs/remotes/git-svn",
+                "git clean --force -d -x",
+                "git checkout --force --detach " + "a" * 40,
+            ],
+        )
+
+    @patch.object(settings, "CACHE_DISABLE", True)
+    def test_update_gitsvn_missing(self, mock_call):
+        """Verify the latest import is not checked out for a missing revision."""
+        mock_call.side_effect = [[], ["30"], [], []]
+
+        with patch("gitman.git._get_config", Mock(return_value="svn://mock/repo")):
+            with pytest.raises(InvalidRepository):
+                git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+
+        check_calls(
+            mock_call,
+            [
+                "git svn find-rev r42 refs/remotes/git-svn",
+                "git svn find-rev refs/remotes/git-svn",
+                "git svn fetch -r 42",
+                "git svn find-rev -B r42 refs/remotes/git-svn",
+            ],
+        )
+
+    @patch("gitman.git.status", Mock(return_value=git.Status(head="a" * 40)))
+    def test_update_gitsvn_current(self, mock_call):
+        """Verify nothing is changed when already at the SVN revision."""
+        mock_call.return_value = ["a" * 40]
+        with patch("gitman.git._get_config", Mock(return_value="svn://mock/repo")):
+            with patch("gitman.git.resolve", Mock(return_value="a" * 40)):
+                git.update("git-svn", "svn://mock/repo", "mock/path", rev="42")
+        check_calls(mock_call, ["git svn find-rev r42 refs/remotes/git-svn"])
+
+    @patch("gitman.git.status", Mock(return_value=None))
     def test_update(self, mock_call):
         """Verify the commands to update a working tree to a revision."""
         git.update("git", "mock.git", "mock/path", rev="mock_rev")
@@ -171,12 +801,29 @@ class TestGit:
             mock_call,
             [
                 "git stash",
+                "git rev-list --walk-reflogs --count refs/stash",
                 "git clean --force -d -x",
                 "git checkout --force mock_rev",
                 "git branch --set-upstream-to origin/mock_rev",
             ],
         )
 
+    @patch("gitman.git.status", Mock(return_value=None))
+    @patch("gitman.git._worktree_mirror", Mock(return_value="cache/mock.mirror"))
+    def test_update_worktree(self, mock_call):
+        """Verify a worktree of a mirror is updated without tracking a branch."""
+        git.update("git", "mock.git", "mock/path", fetch=True, rev="mock_branch")
+        check_calls(
+            mock_call,
+            [
+                "git stash",
+                "git rev-list --walk-reflogs --count refs/stash",
+                "git clean --force -d -x",
+                "git checkout --force --detach mock_branch",
+            ],
+        )
+
+    @patch("gitman.git.status", Mock(return_value=None))
     def test_update_branch(self, mock_call):
         """Verify the commands to update a working tree to a branch."""
         git.update("git", "mock.git", "mock/path", fetch=True, rev="mock_branch")
@@ -184,6 +831,7 @@ class TestGit:
             mock_call,
             [
                 "git stash",
+                "git rev-list --walk-reflogs --count refs/stash",
                 "git clean --force -d -x",
                 "git checkout --force mock_branch",
                 "git branch --set-upstream-to origin/mock_branch",
@@ -191,17 +839,21 @@ class TestGit:
             ],
         )
 
+    @patch("gitman.git.status", Mock(return_value=None))
     def test_update_no_clean(self, mock_call):
         git.update("git", "mock.git", "mock/path", clean=False, rev="mock_rev")
         check_calls(
             mock_call,
             [
                 "git stash",
+                "git rev-list --walk-reflogs --count refs/stash",
                 "git checkout --force mock_rev",
                 "git branch --set-upstream-to origin/mock_rev",
             ],
         )
 
+    @patch("gitman.git.status", Mock(return_value=None))
+    @patch("gitman.git.resolve", Mock(return_value="abc123"))
     def test_update_revparse(self, mock_call):
         """Verify the commands to update a working tree to a rev-parse."""
         mock_call.return_value = ["abc123"]
@@ -211,18 +863,121 @@ class TestGit:
         check_calls(
             mock_call,
             [
-                "git stash",
-                "git clean --force -d -x",
-                "git checkout --force mock_branch",
                 (
                     "git rev-list -n 1 --before='2015-02-12 18:30:00' "
-                    "--first-parent mock_branch"
+                    "--first-parent origin/mock_branch"
                 ),
+                "git stash",
+                "git rev-list --walk-reflogs --count refs/stash",
+                "git clean --force -d -x",
                 "git checkout --force abc123",
                 "git branch --set-upstream-to origin/abc123",
             ],
         )
 
+    @patch("gitman.git.status", Mock(return_value=None))
+    @patch("gitman.git.resolve", Mock(return_value="abc123" * 6 + "abcd"))
+    def test_update_revparse_remembered(self, mock_call, tmpdir):
+        """Verify a date in the past is only resolved once per repository."""
+        sha = "abc123" * 6 + "abcd"
+        mock_call.return_value = [sha]
+        cache = str(tmpdir.join("cache"))
+        os.makedirs(os.path.join(cache, mirrors.key("mock.git") + ".mirror"))
+
+        with patch.object(settings, "CACHE", cache):
+            with patch.object(mirrors.Mirror, "save", SAVE):
+                for _ in range(2):
+                    git.update("git", "mock.git", "mock/path", rev="main@{2015-02-12}")
+
+        revisions = [call for call in mock_call.call_args_list if "-n" in call[0]]
+        expect(len(revisions)) == 1
+        expect(mirrors.get("mock.git", cache).revisions) == {"main@{2015-02-12}": sha}
+
+    @patch("gitman.git.resolve", Mock(side_effect=[None, None, "abc123"]))
+    def test_update_current_commit(self, mock_call):
+        """Verify nothing is run when the tree is already at the commit."""
+        snapshot = git.Status(head="abc123")
+        with patch("gitman.git.status", Mock(return_value=snapshot)):
+            git.update("git", "mock.git", "mock/path", fetch=True, rev="v1.0")
+
+        check_calls(mock_call, [])
+
+    @patch("gitman.git.resolve", Mock(return_value="abc123"))
+    def test_update_current_branch(self, mock_call):
+        """Verify nothing is run when the tree is already at the branch."""
+        snapshot = git.Status(head="abc123", branch="main", upstream="origin/main")
+        with patch("gitman.git.status", Mock(return_value=snapshot)):
+            git.update("git", "mock.git", "mock/path", fetch=True, rev="main")
+
+        check_calls(mock_call, [])
+
+    @patch("gitman.git.resolve", Mock(side_effect=["abc123", "def456"]))
+    def test_update_behind_branch(self, mock_call):
+        """Verify a clean tree behind its upstream is updated without a stash."""
+        snapshot = git.Status(head="abc123", branch="main", upstream="origin/main")
+        with patch("gitman.git.status", Mock(return_value=snapshot)):
+            git.update("git", "mock.git", "mock/path", fetch=True, rev="main")
+
+        check_calls(
+            mock_call,
+            [
+                "git clean --force -d -x",
+                "git checkout --force main",
+                "git branch --set-upstream-to origin/main",
+                "git pull --ff-only --no-rebase",
+            ],
+        )
+
+    @patch("gitman.git.resolve", Mock(return_value="abc123"))
+    def test_update_ignored_files(self, mock_call):
+        """Verify ignored files are still cleaned from a tree at the revision."""
+        snapshot = git.Status(head="abc123", ignored=["!! build/"])
+        with patch("gitman.git.status", Mock(return_value=snapshot)):
+            git.update("git", "mock.git", "mock/path", rev="abc123")
+
+        expect(mock_call.call_args_list[0][0]) == (
+            "git",
+            "clean",
+            "--force",
+            "-d",
+            "-x",
+        )
+
+    @patch("gitman.git._is_current", Mock(return_value=True))
+    def test_update_uses_mirror(self, mock_call):
+        """Verify every update records the use of the cache mirror."""
+        shared = mirrors.Mirror(os.path.join("cache", "mock.mirror"), used=1.0)
+        os.makedirs(shared.path)
+
+        with patch("gitman.mirrors.get", Mock(return_value=shared)):
+            git.update("git", "mock.git", "mock/path", rev="main")
+
+        expect(shared.used) > 1.0
+
+    @patch(
+        "gitman.git.resolve",
+        Mock(side_effect=lambda ref: None if ref.startswith("refs/") else "abc123"),
+    )
+    @patch("gitman.git.status")
+    def test_update_reuses_snapshot(self, mock_status, mock_call):
+        """Verify a snapshot from the caller is not taken again."""
+        snapshot = git.Status(head="abc123")
+        git.update("git", "mock.git", "mock/path", rev="abc123", snapshot=snapshot)
+
+        mock_status.assert_not_called()
+        check_calls(mock_call, [])
+
+    @patch("gitman.git.status", Mock(return_value=git.Status(changes=["M  a"])))
+    def test_update_limits_stash(self, mock_call):
+        """Verify the oldest stash entries are dropped."""
+        mock_call.side_effect = lambda *args, **kwargs: (
+            [str(git.STASH_LIMIT + 2)] if "rev-list" in args else []
+        )
+        git.update("git", "mock.git", "mock/path", clean=False, rev="abc123")
+
+        drops = [call for call in mock_call.call_args_list if "drop" in call[0]]
+        expect(len(drops)) == 2
+
     def test_get_url(self, mock_call):
         """Verify the commands to get the current repository's URL."""
         git.get_url("git")
@@ -242,3 +997,275 @@ class TestGit:
         """Verify the commands to get the working tree's branch."""
         git.get_branch()
         check_calls(mock_call, ["git rev-parse --abbrev-ref HEAD"])
+
+    def test_is_fetch_required_tag(self, mock_call):
+        """Verify tags are resolved without starting a new process."""
+        snapshot = git.Status(head="abc123", branch=None)
+
+        with patch("gitman.git.resolve", Mock(return_value="abc123")) as mock:
+            assert False is git.is_fetch_required("git", "v1", snapshot=snapshot)
+
+        mock.assert_called_once_with("refs/tags/v1^{commit}")
+        check_calls(mock_call, [])
+
+    def test_is_fetch_required_worktree(self, mock_call):
+        """Verify a detached worktree at the tip of its branch is current."""
+        snapshot = git.Status(head="abc123", branch=None)
+        refs = {"refs/heads/main": "abc123"}
+
+        with patch("gitman.git.resolve", Mock(side_effect=refs.get)):
+            assert False is git.is_fetch_required("git", "main", snapshot=snapshot)
+            assert True is git.is_fetch_required("git", "other", snapshot=snapshot)
+
+        check_calls(mock_call, [])
+
+    def test_is_current_worktree_behind_branch(self, mock_call):
+        """Verify a worktree behind its branch is only moved when fetching."""
+        snapshot = git.Status(head="abc123", branch=None)
+        refs = {"refs/heads/main": "def456"}
+
+        with patch("gitman.git.resolve", Mock(side_effect=refs.get)):
+            expect(
+                git._is_current(
+                    snapshot, "main", clean=False, fetch=False, detached=True
+                )
+            ) == True
+            expect(
+                git._is_current(
+                    snapshot, "main", clean=False, fetch=True, detached=True
+                )
+            ) == False
+
+        check_calls(mock_call, ["git merge-base --is-ancestor abc123 def456"])
+
+
+@pytest.fixture
+def repository(tmpdir):
+    tmpdir.chdir()
+    shell.call("git", "init", _show=False)
+    shell.call(
+        "git",
+        "-c",
+        "user.name=Gitman",
+        "-c",
+        "user.email=gitman@example.com",
+        "commit",
+        "--allow-empty",
+        "--message=Initial commit",
+        _show=False,
+    )
+    shell.call("git", "tag", "v1", _show=False)
+    yield tmpdir
+    git.stop_coprocesses()
+
+
+class TestNarrowClone:
+    """Tests for changing the revision of a narrow clone."""
+
+    @pytest.fixture
+    def source(self, repository):
+        shell.call("git", "branch", "dev", _show=False)
+        return repository
+
+    @patch.object(settings, "CLONE_STRATEGY", "auto")
+    @patch.object(settings, "CACHE_DISABLE", True)
+    @pytest.mark.parametrize("rev,strategy", [("v1", "tag"), ("HEAD", "branch")])
+    def test_change_to_branch(self, source, tmpdir_factory, rev, strategy):
+        """Verify a narrow clone can check out a branch it was not cloned for."""
+        if rev == "HEAD":
+            rev = git.get_branch()
+        os.chdir(str(tmpdir_factory.mktemp("deps")))
+        git.clone("git", str(source), "a", rev=rev)
+        expect(git._get_config("gitman.strategy")) == None
+        os.chdir("a")
+        expect(git._get_config("gitman.strategy")) == strategy
+
+        git.fetch("git", str(source), "a", rev="dev")
+        git.update("git", str(source), "a", rev="dev")
+
+        expect(git.get_branch()) == "dev"
+        expect(git._get_config("branch.dev.merge")) == "refs/heads/dev"
+        git.stop_coprocesses()
+
+    @patch.object(settings, "CLONE_STRATEGY", "auto")
+    @patch.object(settings, "CACHE_DISABLE", False)
+    @patch.object(settings, "CACHE_MIRROR_FETCH", True)
+    @patch.object(settings, "FETCH_TARGETED", True)
+    def test_change_to_branch_from_mirror(self, source, tmpdir_factory):
+        """Verify a narrow clone can check out a branch copied from a mirror."""
+        cache = str(tmpdir_factory.mktemp("cache"))
+        os.chdir(str(tmpdir_factory.mktemp("deps")))
+        git.clone("git", str(source), "a", cache=cache, rev="v1")
+        os.chdir("a")
+        expect(git._get_config("gitman.strategy")) == "tag"
+
+        git.fetch("git", str(source), "a", rev="dev", cache=cache)
+        git.update("git", str(source), "a", rev="dev")
+
+        expect(git.get_branch()) == "dev"
+        git.stop_coprocesses()
+
+
+class TestResolve:
+    """Tests for revision lookups answered by a long-lived process."""
+
+    def test_resolve(self, repository):
+        """Verify existing revisions are resolved to a SHA."""
+        sha = git.resolve("HEAD")
+        assert sha is not None
+
+        expect(len(sha)) == 40
+        expect(git.resolve("v1^{commit}")) == sha
+        expect(git.get_object_rev("v1")) == sha
+
+    def test_resolve_missing(self, repository):
+        """Verify missing revisions are not resolved."""
+        expect(git.resolve("unknown")) == None
+        expect(git._local_branch_exists("unknown")) == False
+
+    def test_coprocess_is_reused(self, repository):
+        """Verify a single process answers every lookup."""
+        git.resolve("HEAD")
+        with patch("gitman.shell.subprocess.Popen") as mock_popen:
+            git.resolve("v1")
+
+        expect(mock_popen.called) == False
+
+
+@patch("gitman.git.call")
+@patch("gitman.git.version", Mock(return_value=(2, 40)))
+@patch("gitman.git.sys.platform", "linux")
+class TestTune:
+    """Tests for the performance profile of large checkouts."""
+
+    @patch("gitman.git._get_config", Mock(return_value=None))
+    @patch("gitman.git._index_size", Mock(return_value=250_000))
+    def test_tune_large_checkout(self, mock_call):
+        """Verify a large checkout is measured and tuned."""
+        expect(git.tune()) == "large"
+
+        check_calls(
+            mock_call,
+            [
+                "git config feature.manyFiles true",
+                "git config core.untrackedCache true",
+                "git config checkout.workers 0",
+                "git config index.threads true",
+                "git config fetch.writeCommitGraph true",
+                "git commit-graph write --reachable",
+                "git config gitman.performance large",
+            ],
+        )
+
+    @patch("gitman.git._get_config", Mock(return_value=None))
+    @patch("gitman.git._index_size", Mock(return_value=100))
+    def test_tune_small_checkout(self, mock_call):
+        """Verify a small checkout keeps the defaults once measured."""
+        expect(git.tune()) == "default"
+
+        check_calls(mock_call, ["git config gitman.performance default"])
+
+    @patch("gitman.git._get_config", Mock(return_value="default"))
+    def test_tune_measured_checkout(self, mock_call):
+        """Verify a checkout is not measured again."""
+        expect(git.tune()) == "default"
+
+        check_calls(mock_call, [])
+
+
+class TestBulk:
+    """Tests for deferring housekeeping while many repositories change."""
+
+    @patch("gitman.git.call")
+    @patch("gitman.git.version", Mock(return_value=(2, 40)))
+    @patch("gitman.gitdir.find", Mock(return_value=None))
+    @patch("gitman.git._get_config", Mock(return_value=None))
+    def test_fetch_skips_fetch_head(self, mock_call):
+        """Verify fetches skip writing FETCH_HEAD in bulk operations."""
+        with git.bulk() as touched:
+            git.fetch("git", "mock.git", "mock/path")
+            expect(len(touched)) == 1
+
+        check_calls(
+            mock_call,
+            [
+                "git remote set-url origin mock.git",
+                "git fetch --no-write-fetch-head --tags --force --prune origin",
+            ],
+        )
+
+    @patch("gitman.git.call")
+    @patch("gitman.git.pwd", Mock(return_value="mock/path"))
+    @patch("gitman.git._get_sha_from_rev", Mock(return_value="main"))
+    @patch("gitman.git._worktree_mirror", Mock(return_value=None))
+    @patch("gitman.git._is_current", Mock(return_value=True))
+    @patch.object(settings, "CACHE_DISABLE", True)
+    def test_update_skips_current_checkouts(self, mock_call):
+        """Verify checkouts already at their revision are not maintained."""
+        snapshot = git.Status(head="abc123", branch="main")
+        with git.bulk() as touched:
+            git.update("git", "mock.git", "mock/path", rev="main", snapshot=snapshot)
+            expect(touched) == set()
+
+        check_calls(mock_call, [])
+
+    @patch("gitman.git.call")
+    @patch("gitman.git.version", Mock(return_value=(2, 40)))
+    def test_maintain_checkouts(self, mock_call):
+        """Verify maintenance runs in each repository within the time limit."""
+        expect(git.maintain_checkouts(["b", "a"], time_limit=60)) == 2
+        expect(git.maintain_checkouts(["a"], time_limit=0)) == 0
+
+        check_calls(
+            mock_call,
+            ["git -C a maintenance run --auto", "git -C b maintenance run --auto"],
+        )
+
+
+class TestMaintainMirrors:
+    """Tests for incremental maintenance of cache mirrors."""
+
+    @pytest.fixture
+    def cache(self, repository):
+        reference = mirrors.get(str(repository), str(repository.join("cache")))
+        shell.call(
+            "git", "clone", "--mirror", str(repository), reference.path, _show=False
+        )
+        reference.created_now()
+        return repository.join("cache")
+
+    def test_maintain_mirrors(self, cache):
+        """Verify mirrors with new objects are repacked and indexed."""
+        maintained = git.maintain_mirrors(str(cache))
+
+        expect(len(maintained)) == 1
+        expect(maintained[0].maintained) > 0
+        path = os.path.join(maintained[0].path, "objects", "info")
+        expect(os.path.isdir(os.path.join(path, "commit-graphs"))) == True
+
+        expect(git.maintain_mirrors(str(cache))) == []
+
+    def test_maintain_partial_mirrors(self, repository):
+        """Verify mirrors missing objects are repacked without bitmaps."""
+        shell.call("git", "config", "uploadpack.allowFilter", "true", _show=False)
+        cache = repository.join("cache")
+        reference = mirrors.get(str(repository), str(cache), "blob:none")
+        shell.call(
+            "git",
+            "clone",
+            "--mirror",
+            "--filter=blob:none",
+            pathlib.Path(repository).as_uri(),
+            reference.path,
+            _show=False,
+        )
+        reference.created_now()
+
+        maintained = git.maintain_mirrors(str(cache))
+
+        expect(len(maintained)) == 1
+        expect(git._is_promisor(reference.path)) == True
+
+    def test_maintain_mirrors_time_limit(self, cache):
+        """Verify no maintenance is started once the time limit is reached."""
+        expect(git.maintain_mirrors(str(cache), time_limit=0)) == []
@@ -0,0 +1,138 @@
+# pylint: disable=redefined-outer-name,unused-argument,unused-variable,singleton-comparison,expression-not-assigned
+
+import os
+
+import pytest
+from expecter import expect
+
+from gitman import gitdir, shell
+
+
+def git(*args):
+    return shell.call(
+        "git",
+        "-c",
+        "user.name=Gitman",
+        "-c",
+        "user.email=gitman@example.com",
+        *args,
+        _show=False,
+    )
+
+
+@pytest.fixture
+def repository(tmpdir):
+    tmpdir.chdir()
+    git("init", "--initial-branch=main")
+    git("remote", "add", "origin", "https://example.com/owner/repo.git")
+    git("commit", "--allow-empty", "--message=Initial commit")
+    git("tag", "--annotate", "v1", "--message=Version 1")
+    for index in range(20):
+        git("branch", f"branch-{index:02}")
+    return tmpdir
+
+
+def describe_find():
+    def it_returns_none_outside_a_working_tree(tmpdir):
+        expect(gitdir.find(str(tmpdir))) == None
+
+    def it_locates_the_git_directory(repository):
+        repo = gitdir.find(str(repository))
+        assert repo is not None
+
+        expect(repo.gitdir) == str(repository.join(".git"))
+        expect(repo.commondir) == str(repository.join(".git"))
+
+    def it_follows_worktree_indirection(repository, tmpdir_factory):
+        path = str(tmpdir_factory.mktemp("worktree").join("checkout"))
+        git("worktree", "add", "--detach", path)
+
+        repo = gitdir.find(path)
+
+        assert repo is not None
+
+        expect(repo.commondir) == str(repository.join(".git"))
+        expect(repo.head()) == git("rev-parse", "HEAD")[0]
+        expect(repo.branch()) == "HEAD"
+        expect(repo.url()) == "https://example.com/owner/repo.git"
+
+    def it_follows_worktrees_of_bare_repositories(repository, tmpdir_factory):
+        bare = str(tmpdir_factory.mktemp("cache").join("repo.mirror"))
+        git("clone", "--mirror", str(repository), bare)
+        path = str(tmpdir_factory.mktemp("worktree").join("checkout"))
+        git("-C", bare, "worktree", "add", "--detach", path)
+
+        expect(gitdir.find(bare)) == None
+        worktree = gitdir.find(path)
+        assert worktree is not None
+        expect(worktree.commondir) == bare
+
+    def it_defers_to_git_when_the_environment_overrides_paths(repository, monkeypatch):
+        monkeypatch.setenv("GIT_DIR", str(repository.join(".git")))
+
+        expect(gitdir.find(str(repository))) == None
+
+    def it_defers_to_git_for_unusual_layouts(repository):
+        git("config", "core.worktree", str(repository))
+
+        expect(gitdir.find(str(repository))) == None
+
+
+def describe_repository():
+    def it_reads_the_head_and_branch(repository):
+        repo = gitdir.find(str(repository))
+        assert repo is not None
+
+        expect(repo.head()) == git("rev-parse", "HEAD")[0]
+        expect(repo.branch()) == "main"
+
+    def it_reads_the_remote_url(repository):
+        repo = gitdir.find(str(repository))
+        assert repo is not None
+
+        expect(repo.url()) == "https://example.com/owner/repo.git"
+        expect(repo.url("upstream")) == None
+
+    def it_reads_packed_refs(repository):
+        git("pack-refs", "--all")
+        repo = gitdir.find(str(repository))
+        assert repo is not None
+
+        expect(
+            os.path.exists(repository.join(".git", "refs", "heads", "main"))
+        ) == False
+        for ref in git("for-each-ref", "--format=%(objectname) %(refname)"):
+            sha, name = ref.split(" ")
+            expect(repo.resolve(name)) == sha
+        expect(repo.resolve("refs/heads/unknown")) == None
+        expect(repo.resolve("refs/heads/branch-99")) == None
+        expect(repo.resolve("refs/aaa")) == None
+
+    def it_reads_the_size_of_the_index(repository):
+        repository.join("README.md").write("Hello, world!")
+        git("add", "README.md")
+
+        repo = gitdir.find(str(repository))
+        assert repo is not None
+
+        expect(repo.index_size()) == 1
+
+
+def describe_search_packed_refs():
+    def it_handles_missing_files(tmpdir):
+        expect(gitdir.search_packed_refs(str(tmpdir.join("packed-refs")), "x")) == None
+
+    def it_handles_empty_files(tmpdir):
+        tmpdir.join("packed-refs").write("")
+
+        expect(gitdir.search_packed_refs(str(tmpdir.join("packed-refs")), "x")) == None
+
+    def it_scans_unsorted_files(tmpdir):
+        sha = "1" * 40
+        tmpdir.join("packed-refs").write(
+            f"{'2' * 40} refs/tags/b\n^{'3' * 40}\n{sha} refs/heads/a\n"
+        )
+
+        expect(
+            gitdir.search_packed_refs(str(tmpdir.join("packed-refs")), "refs/heads/a")
+        ) == sha
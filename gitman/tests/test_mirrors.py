@@ -0,0 +1,282 @@
+# pylint: disable=redefined-outer-name,unused-argument,unused-variable,singleton-comparison,expression-not-assigned
+
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from expecter import expect
+
+from gitman import mirrors, shell
+
+
+def describe_normalize():
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://github.com/owner/repo",
+            "https://github.com/owner/repo.git",
+            "https://GitHub.com/owner/repo/",
+            "http://user@github.com/owner/repo.git",
+            "git@github.com:owner/repo.git",
+            "ssh://git@github.com/owner/repo.git",
+            "ssh://git@github.com:22/owner//repo",
+        ],
+    )
+    def it_ignores_spelling_differences(url):
+        expect(mirrors.normalize(url)) == "github.com/owner/repo"
+
+    def it_keeps_the_case_of_paths():
+        expect(mirrors.normalize("https://github.com/Owner/Repo")) == (
+            "github.com/Owner/Repo"
+        )
+
+    @pytest.mark.skipif(os.name == "nt", reason="POSIX paths only")
+    def it_resolves_local_paths(tmpdir):
+        tmpdir.chdir()
+
+        expect(mirrors.normalize("repo.git")) == os.path.join(tmpdir, "repo")
+        expect(mirrors.normalize(f"file://{tmpdir}/repo/")) == os.path.join(
+            tmpdir, "repo"
+        )
+
+
+def describe_key():
+    def it_includes_the_repository_name():
+        expect(mirrors.key("https://github.com/owner/repo.git")).startswith("repo-")
+
+    def it_matches_for_equivalent_urls():
+        expect(mirrors.key("git@github.com:owner/repo.git")) == mirrors.key(
+            "https://github.com/owner/repo"
+        )
+
+    def it_differs_for_repositories_with_the_same_name():
+        expect(mirrors.key("https://github.com/a/utils")) != mirrors.key(
+            "https://gitlab.com/b/utils"
+        )
+
+    def it_differs_for_git_svn_imports():
+        expect(mirrors.key("https://svn.example.com/repo")) != mirrors.key(
+            "https://svn.example.com/repo", type="git-svn"
+        )
+
+
+def describe_mirror():
+    def it_saves_and_loads_metadata(tmpdir):
+        mirror = mirrors.Mirror(str(tmpdir), url="https://example.com/repo")
+        tmpdir.join("data").write("12345")
+
+        mirror.created_now()
+
+        other = mirrors.Mirror(str(tmpdir))
+        other.load()
+        expect(other.url) == "https://example.com/repo"
+        expect(other.created) == mirror.created
+        expect(other.size) == 5
+        expect(tmpdir.listdir(lambda path: path.ext == ".tmp")) == []
+
+    def it_merges_metadata_saved_meanwhile(tmpdir):
+        mirror = mirrors.Mirror(str(tmpdir))
+        other = mirrors.Mirror(str(tmpdir))
+
+        mirror.revisions["main@2020-01-01"] = "abc123"
+        mirror.save()
+        other.used_now()
+
+        saved = mirrors.Mirror(str(tmpdir))
+        saved.load()
+        expect(saved.revisions) == {"main@2020-01-01": "abc123"}
+        expect(saved.used) == other.used
+
+    def it_ignores_missing_metadata(tmpdir):
+        mirror = mirrors.Mirror(str(tmpdir))
+
+        mirror.load()
+
+        expect(mirror.created) == 0
+
+
+def describe_get():
+    @pytest.fixture
+    def legacy(tmpdir):
+        path = tmpdir.join("repo.reference")
+        shell.call("git", "init", "--bare", str(path), _show=False)
+        shell.call(
+            "git",
+            "-C",
+            str(path),
+            "remote",
+            "add",
+            "origin",
+            "https://example.com/owner/repo.git",
+            _show=False,
+        )
+        return path
+
+    def it_uses_a_hashed_location(tmpdir):
+        mirror = mirrors.get("https://example.com/owner/repo.git", str(tmpdir))
+
+        expect(mirror.path) == os.path.join(
+            tmpdir, mirrors.key("https://example.com/owner/repo.git") + ".mirror"
+        )
+        expect(mirror.exists) == False
+
+    @pytest.mark.skipif(os.name == "nt", reason="symlinks require privileges")
+    def it_migrates_a_legacy_mirror(tmpdir, legacy):
+        mirror = mirrors.get("git@example.com:owner/repo", str(tmpdir))
+
+        expect(mirror.exists) == True
+        expect(os.path.islink(legacy)) == True
+        expect(os.path.realpath(legacy)) == os.path.realpath(mirror.path)
+        expect(mirror.used) > 0
+        expect(mirror.tracked) == True
+
+    def it_skips_a_legacy_mirror_of_another_repository(tmpdir, legacy):
+        mirror = mirrors.get("https://example.com/other/repo", str(tmpdir))
+
+        expect(mirror.exists) == False
+        expect(os.path.islink(legacy)) == False
+
+
+def describe_locked():
+    @pytest.mark.skipif(os.name == "nt", reason="advisory locks are POSIX only")
+    def it_excludes_other_processes(tmpdir):
+        mirror = mirrors.Mirror(str(tmpdir.join("repo-123.mirror")))
+        script = (
+            "import fcntl, sys\n"
+            "with open(sys.argv[1]) as file:\n"
+            "    fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)\n"
+        )
+
+        with mirrors.locked(mirror):
+            expect(os.path.isfile(tmpdir.join("repo-123.lock"))) == True
+            with pytest.raises(subprocess.CalledProcessError):
+                subprocess.run(
+                    [sys.executable, "-c", script, mirror.lock_path],
+                    check=True,
+                    capture_output=True,
+                )
+
+        subprocess.run([sys.executable, "-c", script, mirror.lock_path], check=True)
+
+    def it_can_be_taken_again_by_the_same_thread(tmpdir):
+        mirror = mirrors.Mirror(str(tmpdir.join("repo-123.mirror")))
+        results = []
+
+        def lock():
+            with mirrors.locked(mirror, wait=False) as acquired:
+                results.append(acquired)
+
+        with mirrors.locked(mirror):
+            with mirrors.locked(mirror, wait=False) as acquired:
+                expect(acquired) == True
+            thread = threading.Thread(target=lock)
+            thread.start()
+            thread.join()
+
+        expect(results) == [False]
+
+
+def describe_collect():
+    @pytest.fixture
+    def cache(tmpdir):
+        remote = tmpdir.join("remote")
+        shell.call("git", "init", "--bare", str(remote), _show=False)
+        cache = tmpdir.join("cache")
+        for name in ["used", "unused"]:
+            mirror = mirrors.get(str(tmpdir.join(name)), str(cache))
+            shell.call(
+                "git", "clone", "--mirror", str(remote), mirror.path, _show=False
+            )
+            mirror.created_now()
+        return cache
+
+    @pytest.fixture
+    def checkout(tmpdir, cache):
+        mirror = mirrors.get(str(tmpdir.join("used")), str(cache))
+        path = tmpdir.join("checkout")
+        shell.call("git", "init", str(path), _show=False)
+        path.join(".git", "objects", "info", "alternates").write(
+            os.path.join(mirror.path, "objects") + "\n"
+        )
+        mirror.register(str(path))
+        return path
+
+    @pytest.fixture
+    def worktree(tmpdir, cache):
+        mirror = mirrors.get(str(tmpdir.join("used")), str(cache))
+        path = tmpdir.join("worktree")
+        sha = shell.call(
+            "git",
+            "-C",
+            mirror.path,
+            "-c",
+            "user.name=Gitman",
+            "-c",
+            "user.email=gitman@example.com",
+            "commit-tree",
+            "-m",
+            "Initial commit",
+            "4b825dc642cb6eb9a060e54bf8d69288fbee4904",  # the empty tree
+            _show=False,
+        )[0]
+        shell.call(
+            "git", "-C", mirror.path, "worktree", "add", str(path), sha, _show=False
+        )
+        mirror.register(str(path))
+        return path
+
+    def it_deletes_unused_mirrors(tmpdir, cache, checkout):
+        removed = mirrors.collect(str(cache))
+
+        expect([mirror.url for mirror in removed]) == [str(tmpdir.join("unused"))]
+        expect(len(mirrors.scan(str(cache)))) == 1
+
+    def it_keeps_mirrors_without_registered_checkouts(tmpdir, cache):
+        for mirror in mirrors.scan(str(cache)):
+            os.remove(os.path.join(mirror.path, mirrors.REFERENCES))
+
+        expect(mirrors.collect(str(cache))) == []
+        expect(mirrors.collect(str(cache), max_size=0)) == []
+
+    def it_can_delete_mirrors_without_registered_checkouts_to_fit_a_budget(cache):
+        for mirror in mirrors.scan(str(cache)):
+            os.remove(os.path.join(mirror.path, mirrors.REFERENCES))
+
+        mirrors.collect(str(cache), max_size=0, dissociate=True)
+
+        expect(mirrors.scan(str(cache))) == []
+
+    def it_keeps_mirrors_locked_by_others(tmpdir, cache, checkout):
+        mirror = mirrors.get(str(tmpdir.join("unused")), str(cache))
+        removed: list = []
+
+        with mirrors.locked(mirror):
+            thread = threading.Thread(
+                target=lambda: removed.extend(mirrors.collect(str(cache)))
+            )
+            thread.start()
+            thread.join()
+
+        expect(removed) == []
+        expect(len(mirrors.scan(str(cache)))) == 2
+
+    def it_keeps_mirrors_in_use_within_a_budget(cache, checkout):
+        mirrors.collect(str(cache), max_size=0)
+
+        expect(len(mirrors.scan(str(cache)))) == 1
+
+    def it_can_dissociate_checkouts_to_fit_a_budget(cache, checkout):
+        mirrors.collect(str(cache), max_size=0, dissociate=True)
+
+        expect(mirrors.scan(str(cache))) == []
+        expect(checkout.join(".git", "objects", "info", "alternates").exists()) == (
+            False
+        )
+
+    def it_keeps_mirrors_with_worktrees(cache, worktree):
+        mirrors.collect(str(cache), max_size=0, dissociate=True)
+
+        expect(len(mirrors.scan(str(cache)))) == 1
+        expect(worktree.join(".git").isfile()) == True
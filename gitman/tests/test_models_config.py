@@ -1,11 +1,13 @@
 # pylint: disable=redefined-outer-name,unused-variable,expression-not-assigned,len-as-condition
 
 import os
+from unittest.mock import Mock, patch
 
 import pytest
 from expecter import expect
 
-from gitman.models import Config, load_config
+from gitman.exceptions import DependencyFailures, ShellError
+from gitman.models import Config, Source, load_config
 
 from .conftest import FILES
 
@@ -148,3 +150,41 @@ class TestLoad:
         config = load_config()
 
         assert None is config
+
+
+def describe_install_dependencies():
+    @pytest.fixture
+    def config(tmpdir):
+        tmpdir.chdir()
+        config = Config(str(tmpdir), location="deps")
+        location = tmpdir.mkdir("deps")
+        for name in ["foo", "bar", "qux"]:
+            location.mkdir(name)
+            config.sources.append(Source(repo=f"http://example.com/{name}", name=name))
+        return config
+
+    @patch("gitman.models.source.Source.create_links", Mock())
+    @patch("gitman.models.source.Source.update_files")
+    def it_updates_sources_in_parallel(mock_update_files, config):
+        count = config.install_dependencies(jobs=2)
+
+        expect(count) == 3
+        expect(mock_update_files.call_count) == 3
+
+    @patch("gitman.models.source.Source.create_links", Mock())
+    @patch("gitman.models.source.Source.update_files")
+    def it_reports_all_failures_when_keeping_going(mock_update_files, config):
+        mock_update_files.side_effect = ShellError("mock failure")
+
+        with pytest.raises(DependencyFailures) as excinfo:
+            config.install_dependencies(jobs=2, keep_going=True)
+
+        expect(sorted(excinfo.value.errors)) == ["bar", "foo", "qux"]
+
+    @patch("gitman.models.source.Source.create_links", Mock())
+    @patch("gitman.models.source.Source.update_files")
+    def it_stops_on_the_first_failure_by_default(mock_update_files, config):
+        mock_update_files.side_effect = ShellError("mock failure")
+
+        with pytest.raises(ShellError):
+            config.install_dependencies(jobs=2)
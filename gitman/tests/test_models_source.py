@@ -5,6 +5,7 @@ from unittest.mock import Mock, patch
 
 import pytest
 
+from gitman.exceptions import ShellError, UncommittedChanges
 from gitman.models import Source
 
 
@@ -62,6 +63,8 @@ class TestSource:
     @patch("gitman.shell.cd", Mock(return_value=True))
     @patch("gitman.git.valid", Mock(return_value=True))
     @patch("gitman.git.changes", Mock(return_value=False))
+    @patch("gitman.git.status", Mock(return_value=None))
+    @patch("gitman.git.tune", Mock())
     @patch("gitman.git.update")
     @patch("gitman.git.fetch")
     @patch("gitman.git.is_fetch_required")
@@ -74,19 +77,70 @@ class TestSource:
         source.update_files()
 
         mock_clone.assert_called_once_with(
-            "git", "repo", "name", rev="rev", sparse_paths=[], user_params=None
+            "git",
+            "repo",
+            "name",
+            rev="rev",
+            sparse_paths=[],
+            user_params=None,
+            filter=None,
+            checkout="clone",
+        )
+        mock_is_fetch_required.assert_called_once_with("git", "rev", snapshot=None)
+        mock_fetch.assert_called_once_with(
+            "git", "repo", "name", rev="rev", filter=None, refresh=False
         )
-        mock_is_fetch_required.assert_called_once_with("git", "rev")
-        mock_fetch.assert_called_once_with("git", "repo", "name", rev="rev")
         mock_update.assert_called_once_with(
-            "git", "repo", "name", clean=True, fetch=False, rev="rev"
+            "git",
+            "repo",
+            "name",
+            clean=True,
+            fetch=False,
+            rev="rev",
+            filter=None,
+            snapshot=None,
+        )
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch("os.listdir", Mock(return_value=["test_file"]))
+    @patch("gitman.shell.cd", Mock(return_value=True))
+    @patch("gitman.git.valid", Mock(return_value=True))
+    @patch("gitman.git.changes", Mock(return_value=False))
+    @patch("gitman.git.is_fetch_required", Mock(return_value=False))
+    @patch("gitman.git.tune", Mock())
+    @patch("gitman.git.update")
+    @patch("gitman.git.status")
+    def test_update_files_reuses_snapshot(self, mock_status, mock_update):
+        """Verify the working tree is only checked once per update."""
+        source = Source(type="git", repo="repo", name="name", rev="rev")
+        source.update_files()
+
+        mock_status.assert_called_once_with(
+            "git", include_untracked=True, include_ignored=True
         )
+        assert mock_update.call_args[1]["snapshot"] is mock_status.return_value
+
+    @patch("os.path.isdir", Mock(return_value=True))
+    @patch("os.listdir", Mock(return_value=["test_file"]))
+    @patch("gitman.shell.cd", Mock(return_value=True))
+    @patch("gitman.git.valid", Mock(return_value=True))
+    @patch("gitman.git.status", Mock(side_effect=ShellError))
+    @patch("gitman.git.update")
+    def test_update_files_when_status_fails(self, mock_update):
+        """Verify a failed check of the working tree counts as changes."""
+        source = Source(type="git", repo="repo", name="name", rev="rev")
+
+        with pytest.raises(UncommittedChanges):
+            source.update_files()
+
+        mock_update.assert_not_called()
 
     @patch("os.path.isdir", Mock(return_value=True))
     @patch("os.listdir", Mock(return_value=["test_file"]))
     @patch("gitman.shell.cd", Mock(return_value=True))
     @patch("gitman.git.valid", Mock(return_value=False))
     @patch("gitman.git.changes", Mock(return_value=False))
+    @patch("gitman.git.tune", Mock())
     @patch("gitman.git.update")
     @patch("gitman.git.fetch")
     @patch("gitman.git.is_fetch_required")
@@ -110,6 +164,7 @@ class TestSource:
     @patch("gitman.shell.cd", Mock(return_value=True))
     @patch("gitman.git.valid", Mock(return_value=False))
     @patch("gitman.git.changes", Mock(return_value=False))
+    @patch("gitman.git.tune", Mock())
     @patch("gitman.git.update")
     @patch("gitman.git.fetch")
     @patch("gitman.git.is_fetch_required")
@@ -125,9 +180,18 @@ class TestSource:
         mock_clone.assert_not_called()
         mock_rebuild.assert_called_once_with("git", "repo")
         mock_is_fetch_required.assert_not_called()
-        mock_fetch.assert_called_once_with("git", "repo", "name", rev="rev")
+        mock_fetch.assert_called_once_with(
+            "git", "repo", "name", rev="rev", filter=None, refresh=True
+        )
         mock_update.assert_called_once_with(
-            "git", "repo", "name", clean=True, fetch=True, rev="rev"
+            "git",
+            "repo",
+            "name",
+            clean=True,
+            fetch=True,
+            rev="rev",
+            filter=None,
+            snapshot=None,
         )
 
     def test_identify_missing(self, source, tmpdir):
@@ -24,6 +24,8 @@ class TestMain:
                 skip_changes=False,
                 skip_scripts=False,
                 skip_patches=False,
+                jobs=1,
+                keep_going=False,
                 skip_default_group=False,
             ),
             call.install().__bool__(),  # command status check
@@ -48,6 +50,8 @@ class TestMain:
                 skip_changes=False,
                 skip_scripts=False,
                 skip_patches=False,
+                jobs=1,
+                keep_going=False,
             ),
             call.update().__bool__(),  # command status check
         ] == mock_commands.mock_calls
@@ -71,6 +75,8 @@ class TestMain:
                 skip_changes=False,
                 skip_scripts=False,
                 skip_patches=False,
+                jobs=1,
+                keep_going=False,
             ),
             call.update().__bool__(),  # command status check
         ] == mock_commands.mock_calls
@@ -94,6 +100,8 @@ class TestMain:
                 skip_changes=False,
                 skip_scripts=False,
                 skip_patches=False,
+                jobs=1,
+                keep_going=False,
             ),
             call.update().__bool__(),  # command status check
         ] == mock_commands.mock_calls
@@ -117,6 +125,8 @@ class TestMain:
                 skip_changes=True,
                 skip_scripts=False,
                 skip_patches=False,
+                jobs=1,
+                keep_going=False,
             ),
             call.update().__bool__(),  # command status check
         ] == mock_commands.mock_calls
@@ -141,6 +151,6 @@ class TestMain:
         plugin.main(["--uninstall", "--force"])
 
         assert [
-            call.delete(root=None, force=True, keep_location=False),
+            call.delete(root=None, force=True, keep_location=False, background=False),
             call.delete().__bool__(),  # command status check
         ] == mock_commands.mock_calls
@@ -1,6 +1,9 @@
 # pylint: disable=expression-not-assigned
 
 import os
+import shutil
+import sys
+import tempfile
 from unittest.mock import Mock, patch
 
 import pytest
@@ -33,18 +36,145 @@ class TestCall:
 
         expect(lines) == ["Hello, world!"]
 
+    def test_other_capture_matches_streaming(self):
+        """Verify output read all at once is split like streamed output."""
+        code = "import sys; sys.stdout.write(' a \\r\\n\\nb\\rc')"
+
+        lines = shell.call(sys.executable, "-c", code, _show=False)
+
+        expect(lines) == ["a", "", "b", "c"]
+        expect(shell.call(sys.executable, "-c", code, _stream=True)) == lines
+
+    def test_other_capture_to_log(self, tmpdir, monkeypatch):
+        """Verify only the end of the output is kept when it is logged."""
+        monkeypatch.setattr(shell, "TAIL_LINES", 2)
+        path = str(tmpdir.join("logs", "mock.log"))
+        code = "for i in range(5): print(i)"
+
+        lines = shell.call(sys.executable, "-c", code, _show=False, _log=path)
+
+        expect(lines) == ["3", "4"]
+        expect(tmpdir.join("logs", "mock.log").read().splitlines()[1:]) == [
+            "0",
+            "1",
+            "2",
+            "3",
+            "4",
+        ]
+
+    def test_other_error_refers_to_log(self, tmpdir, monkeypatch):
+        """Verify errors show the end of the output and the log location."""
+        monkeypatch.setattr(shell, "TAIL_LINES", 1)
+        path = str(tmpdir.join("mock.log"))
+        code = "print('first'); print('last'); raise SystemExit(1)"
+
+        with pytest.raises(ShellError) as excinfo:
+            shell.call(sys.executable, "-c", code, _show=False, _log=path)
+
+        expect(excinfo.value.output) == ["last"]
+        expect(excinfo.value.log) == path
+        expect(str(excinfo.value)).endswith(path)
+
+
+class TestIterate:
+    """Tests for reading program output one record at a time."""
+
+    def test_records(self):
+        """Verify output is split on the separator."""
+        code = "import sys; sys.stdout.write('a b\\0c\\0')"
+        records = shell.iterate(sys.executable, "-c", code, _show=False)
+
+        expect(list(records)) == ["a b", "c"]
+
+    def test_error(self):
+        """Verify program errors raise exceptions."""
+        with pytest.raises(ShellError):
+            list(shell.iterate("git", "--invalid-git-argument"))
+
+    def test_close_early(self):
+        """Verify the program can be stopped before its output is read."""
+        code = "import sys; sys.stdout.write('x\\0' * 1000000)"
+        records = shell.iterate(sys.executable, "-c", code, _show=False)
+
+        expect(next(records)) == "x"
+        records.close()
+
+
+class TestConfigured:
+    """Tests for passing Git configuration to called programs."""
+
+    def test_config_is_passed_to_git(self):
+        """Verify configuration reaches Git without changing this process."""
+        with shell.configured({"gc.auto": "0"}):
+            lines = shell.call("git", "config", "--get", "gc.auto", _show=False)
+            expect("GIT_CONFIG_COUNT" in os.environ) == False
+
+        expect(lines) == ["0"]
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires a POSIX shell")
+    def test_config_is_not_passed_to_scripts(self):
+        """Verify configuration does not leak into scripts run by the user."""
+        with shell.configured({"gc.auto": "0"}):
+            lines = shell.call(
+                "echo ${GIT_CONFIG_COUNT:-none}", _show=False, _shell=True
+            )
+
+        expect(lines) == ["none"]
+
+
+class TestIsolated:
+    """Tests for thread-specific working directories."""
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires POSIX paths")
+    def test_cd_does_not_change_process_directory(self, tmpdir):
+        """Verify 'cd' is tracked for the current thread only."""
+        tmpdir.mkdir("child")
+        cwd = os.getcwd()
+
+        with shell.isolated(str(tmpdir)):
+            shell.cd("child")
+            expect(os.getcwd()) == cwd
+            expect(shell.pwd()) == str(tmpdir.join("child"))
+
+        expect(shell.pwd()) == cwd
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires a POSIX shell")
+    def test_call_uses_thread_directory(self, tmpdir):
+        """Verify programs are called from the isolated directory."""
+        with shell.isolated(str(tmpdir)):
+            lines = shell.call("pwd", _show=False)
+
+        expect(os.path.realpath(lines[0])) == os.path.realpath(str(tmpdir))
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires a POSIX shell")
+    def test_call_is_refused_after_interrupt(self, tmpdir):
+        """Verify new programs are not started once interrupted."""
+        shell.interrupt()
+        try:
+            with shell.isolated(str(tmpdir)):
+                with pytest.raises(KeyboardInterrupt):
+                    shell.call("pwd", _show=False)
+        finally:
+            shell.resume()
+
 
 @patch("gitman.shell.call")
 class TestPrograms:
     """Tests for calls to shell programs."""
 
-    def test_mkdir(self, mock_call):
-        """Verify the commands to create directories."""
-        shell.mkdir("mock/dirpath")
+    @patch("gitman.shell.show")
+    def test_mkdir(self, mock_show, mock_call, tmpdir):
+        """Verify directories are created without calling a program."""
+        path = str(tmpdir.join("mock", "dirpath"))
+
+        shell.mkdir(path)
+
+        expect(os.path.isdir(path)) == True
         if os.name == "nt":
-            check_calls(mock_call, ["mkdir mock/dirpath"])
+            mock_show.assert_called_once_with("mkdir", path)
         else:
-            check_calls(mock_call, ["mkdir -p mock/dirpath"])
+            mock_show.assert_called_once_with("mkdir", "-p", path)
+        check_calls(mock_call, [])
 
     @patch("os.chdir")
     def test_cd(self, mock_chdir, mock_call):
@@ -72,30 +202,133 @@ class TestPrograms:
 
     @patch("os.path.isdir", Mock(return_value=False))
     @patch("os.path.exists", Mock(return_value=False))
+    @patch("os.makedirs")
     @patch("os.symlink")
-    def test_ln_missing_parent(self, mock_symlink, mock_call):
+    def test_ln_missing_parent(self, mock_symlink, mock_makedirs, mock_call):
         """Verify the commands to create symbolic links (missing parent)."""
         shell.ln("mock/target", "mock/source")
+        mock_makedirs.assert_called_once_with("mock", exist_ok=True)
         mock_symlink.assert_called_once_with("mock/target", "mock/source")
+        check_calls(mock_call, [])
+
+    @patch("gitman.shell.show")
+    def test_rm_file(self, mock_show, mock_call, tmpdir):
+        """Verify files are deleted without calling a program."""
+        path = tmpdir.join("mock")
+        path.write("")
+
+        shell.rm(str(path))
+
+        expect(path.exists()) == False
         if os.name == "nt":
-            check_calls(mock_call, ["mkdir mock"])
+            mock_show.assert_called_once_with("del", "/Q", "/F", str(path))
         else:
-            check_calls(mock_call, ["mkdir -p mock"])
+            mock_show.assert_called_once_with("rm", "-rf", str(path))
+        check_calls(mock_call, [])
+
+    @patch("gitman.shell.show")
+    def test_rm_directory(self, mock_show, mock_call, tmpdir):
+        """Verify directory trees are deleted without calling a program."""
+        path = tmpdir.join("dirpath")
+        for name in ["a", "b", "c"]:
+            path.join(name, "nested", "file").write("", ensure=True)
+        path.join("file").write("")
 
-    @patch("os.path.isfile", Mock(return_value=True))
-    def test_rm_file(self, mock_call):
-        """Verify the commands to delete files."""
-        shell.rm("mock/path")
+        shell.rm(str(path))
+
+        expect(path.exists()) == False
         if os.name == "nt":
-            check_calls(mock_call, ["del /Q /F mock/path"])
+            mock_show.assert_called_once_with("rmdir", "/Q", "/S", str(path))
         else:
-            check_calls(mock_call, ["rm -rf mock/path"])
+            mock_show.assert_called_once_with("rm", "-rf", str(path))
+        check_calls(mock_call, [])
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires POSIX symlinks")
+    def test_rm_keeps_link_targets(self, mock_call, tmpdir):
+        """Verify links are deleted without deleting what they point to."""
+        target = tmpdir.join("target")
+        target.join("file").write("", ensure=True)
+        tmpdir.join("dirpath").mkdir().join("link").mksymlinkto(target)
+
+        shell.rm(str(tmpdir.join("dirpath")))
+
+        expect(target.join("file").exists()) == True
+        check_calls(mock_call, [])
+
+    def test_rm_missing(self, mock_call, tmpdir):
+        """Verify deleting a missing path is not an error."""
+        shell.rm(str(tmpdir.join("missing")))
+        check_calls(mock_call, [])
+
+    @pytest.mark.skipif(os.name == "nt", reason="Requires POSIX permissions")
+    @pytest.mark.skipif(
+        hasattr(os, "geteuid") and os.geteuid() == 0, reason="Requires a user"
+    )
+    def test_rm_error(self, mock_call, tmpdir):
+        """Verify failures to delete are reported like failed programs."""
+        path = tmpdir.join("dirpath")
+        path.join("file").write("", ensure=True)
+        path.chmod(0o500)
+        try:
+            with pytest.raises(ShellError):
+                shell.rm(str(path))
+        finally:
+            path.chmod(0o700)
+        check_calls(mock_call, [])
+
+    def test_trash(self, mock_call, tmpdir):
+        """Verify paths are moved aside to be deleted later."""
+        path = tmpdir.join("dirpath")
+        path.join("file").write("", ensure=True)
+
+        shell.trash(str(path), str(tmpdir.join("trash")))
+
+        expect(path.exists()) == False
+        expect(len(tmpdir.join("trash").listdir())) == 1
+        check_calls(mock_call, [])
+
+    def test_trash_during_purge(self, mock_call, tmpdir):
+        """Verify paths are moved aside while a purge deletes the directory."""
+        path = tmpdir.join("dirpath")
+        path.join("file").write("", ensure=True)
+        mkdtemp = tempfile.mkdtemp
+        purged: list = []
+
+        def purge_once(**kwargs):
+            if not purged:
+                purged.append(kwargs["dir"])
+                shutil.rmtree(kwargs["dir"])
+            return mkdtemp(**kwargs)
+
+        with patch("tempfile.mkdtemp", Mock(side_effect=purge_once)):
+            shell.trash(str(path), str(tmpdir.join("trash")))
+
+        expect(purged) == [str(tmpdir.join("trash"))]
+        expect(path.exists()) == False
+        expect(len(tmpdir.join("trash").listdir())) == 1
+        check_calls(mock_call, [])
+
+    @patch("tempfile.mkdtemp", Mock(side_effect=FileNotFoundError))
+    def test_trash_deletes_when_purged(self, mock_call, tmpdir):
+        """Verify paths are deleted when they cannot be moved aside."""
+        path = tmpdir.join("dirpath")
+        path.join("file").write("", ensure=True)
+
+        shell.trash(str(path), str(tmpdir.join("trash")))
+
+        expect(path.exists()) == False
+        check_calls(mock_call, [])
+
+    @patch("gitman.shell.detach")
+    def test_purge(self, mock_detach, mock_call, tmpdir):
+        """Verify moved paths are deleted by a detached program."""
+        shell.purge(str(tmpdir.join("missing")))
+        shell.purge(str(tmpdir))
 
-    @patch("os.path.isdir", Mock(return_value=True))
-    def test_rm_directory(self, mock_call):
-        """Verify the commands to delete directories."""
-        shell.rm("mock/dirpath")
         if os.name == "nt":
-            check_calls(mock_call, ["rmdir /Q /S mock/dirpath"])
+            mock_detach.assert_called_once_with(
+                "cmd", "/c", "rmdir", "/Q", "/S", str(tmpdir)
+            )
         else:
-            check_calls(mock_call, ["rm -rf mock/dirpath"])
+            mock_detach.assert_called_once_with("rm", "-rf", str(tmpdir))
+        check_calls(mock_call, [])
@@ -28,6 +28,9 @@ sources:
     rev: example-branch
     type: git
     params:
+    filter:
+    checkout: clone
+    performance:
     sparse_paths:
       -
     links:
@@ -41,6 +44,9 @@ sources:
     rev: example-tag
     type: git
     params:
+    filter:
+    checkout: clone
+    performance:
     sparse_paths:
       -
     links:
@@ -54,6 +60,9 @@ sources:
     rev: 9bf18e16b956041f0267c21baad555a23237b52e
     type: git
     params:
+    filter:
+    checkout: clone
+    performance:
     sparse_paths:
       -
     links:
@@ -106,6 +115,9 @@ def describe_init():
             rev: master
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -120,6 +132,9 @@ def describe_init():
             rev: ebbbf773431ba07510251bb03f9525c7bab2b13a
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -505,6 +520,9 @@ def describe_install():
             name: gitman_1
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-branch
@@ -518,6 +536,9 @@ def describe_install():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -549,6 +570,9 @@ def describe_install():
             name: gitman_1
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-branch
@@ -562,6 +586,9 @@ def describe_install():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -692,6 +719,9 @@ def describe_update():
             name: gitman_1
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-branch
@@ -705,6 +735,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -719,6 +752,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: (old revision)
@@ -744,6 +780,9 @@ def describe_update():
             rev: example-branch
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -757,6 +796,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -771,6 +813,9 @@ def describe_update():
             rev: 7bd138fe7359561a8c2ff9d195dff238794ccc04
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -793,6 +838,9 @@ def describe_update():
             rev: example-branch
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -805,6 +853,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -820,6 +871,9 @@ def describe_update():
             rev: (old revision)
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -843,6 +897,9 @@ def describe_update():
             rev: example-branch
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -856,6 +913,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -870,6 +930,9 @@ def describe_update():
             rev: (old revision)
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -916,6 +979,9 @@ def describe_update():
             name: gitman_1
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-branch
@@ -929,6 +995,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -942,6 +1011,9 @@ def describe_update():
             name: gitman_3
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -956,6 +1028,9 @@ def describe_update():
             name: gitman_1
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: (old revision)
@@ -969,6 +1044,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: (old revision)
@@ -997,6 +1075,9 @@ def describe_update():
             rev: example-branch
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1010,6 +1091,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1023,6 +1107,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1037,6 +1124,9 @@ def describe_update():
             rev: dfd561870c0eb6e814f8f6cd11f8f62f4ae88ea0
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1050,6 +1140,9 @@ def describe_update():
             rev: 7bd138fe7359561a8c2ff9d195dff238794ccc04
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1090,6 +1183,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -1104,6 +1200,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: (old revision)
@@ -1128,6 +1227,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1142,6 +1244,9 @@ def describe_update():
             rev: (old revision)
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1186,6 +1291,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: example-tag
@@ -1200,6 +1308,9 @@ def describe_update():
             name: gitman_2
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             rev: (old revision)
@@ -1225,6 +1336,9 @@ def describe_update():
             rev: example-tag
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1239,6 +1353,9 @@ def describe_update():
             rev: 7bd138fe7359561a8c2ff9d195dff238794ccc04
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1348,6 +1465,9 @@ def describe_lock():
             rev: dfd561870c0eb6e814f8f6cd11f8f62f4ae88ea0
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1361,6 +1481,9 @@ def describe_lock():
             rev: 7bd138fe7359561a8c2ff9d195dff238794ccc04
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1374,6 +1497,9 @@ def describe_lock():
             rev: 9bf18e16b956041f0267c21baad555a23237b52e
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1396,6 +1522,9 @@ def describe_lock():
             rev: dfd561870c0eb6e814f8f6cd11f8f62f4ae88ea0
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links:
@@ -1409,6 +1538,9 @@ def describe_lock():
             rev: 9bf18e16b956041f0267c21baad555a23237b52e
             type: git
             params:
+            filter:
+            checkout: clone
+            performance:
             sparse_paths:
               -
             links: